@@ -3,68 +3,317 @@
 支持将PDF文档和Word文档分为奇数页和偶数页分别打印，支持手动选择打印机
 """
 from flask import Flask, render_template, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
+import io
 import tempfile
 import subprocess
+import shutil
+import socket
 from pathlib import Path
 from pypdf import PdfReader, PdfWriter
+from werkzeug.exceptions import RequestEntityTooLarge
 import json
+import hashlib
+import importlib
 import traceback
 import sys
 import re
+import time
+import threading
+import atexit
+from functools import lru_cache
+from itertools import compress
+from concurrent.futures import ThreadPoolExecutor
+
+# 可选依赖：orjson（C扩展，JSON编解码比标准库json快），未安装时使用json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 可选依赖：pikepdf（qpdf的Python绑定，拆分大PDF比pypdf快得多），未安装时使用pypdf
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+# 可选依赖：waitress（纯Python的WSGI服务器），未安装时使用Flask自带的开发服务器
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+# 打包后的应用中，模板在打包时被写入_bundled_templates模块（见build.spec），不需要从文件读取
+try:
+    import _bundled_templates
+except ImportError:
+    _bundled_templates = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    使用orjson序列化jsonify的响应，orjson无法处理的对象交给默认实现
+    """
+    
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+        except TypeError:
+            # 如非字符串的字典键、超出64位的整数（orjson.JSONEncodeError是TypeError的子类）
+            return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
 CORS(app)
 
+if _bundled_templates is not None:
+    from jinja2 import DictLoader
+    app.jinja_loader = DictLoader(_bundled_templates.TEMPLATES)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # 是否为开发模式（可以通过环境变量设置）
 # 注意：在 app.run(debug=True) 时，会在主函数中设置为True
 DEBUG_MODE = os.environ.get('FLASK_ENV') == 'development' or os.environ.get('DEBUG', '').lower() == 'true'
+# 开发服务器的默认监听地址和调试开关（可通过环境变量设置，命令行参数优先）
+PORT = int(os.environ.get('PORT', 8000))
+HOST = os.environ.get('HOST', '0.0.0.0')
+DEBUG = os.environ.get('DEBUG', '').lower() == 'true'
+# 使用waitress时处理请求的线程数，上传转换Word时不会阻塞打印状态查询
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 8))
+
+# 错误响应中是否包含堆栈跟踪（启动时确定一次，命令行 --debug 启动时会更新）
+# app.debug在创建app时由FLASK_DEBUG决定（FLASK_DEBUG=1 或 flask --debug run）
+INCLUDE_TRACEBACK = app.debug or DEBUG_MODE
 
 # 配置
 UPLOAD_FOLDER = 'uploads'
 TEMP_FOLDER = 'temp'
+# Linux上默认把上传和临时文件放在内存文件系统（/dev/shm）中，可通过环境变量 USE_TMPFS=false 关闭
+USE_TMPFS = os.environ.get('USE_TMPFS', 'true').lower() != 'false'
+TMPFS_ROOT = '/dev/shm/print_auto'  # 每个进程使用其中以进程ID命名的子目录
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx'}
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024  # 上传文件大小上限（字节）
+UPLOAD_CHUNK_SIZE = 128 * 1024  # 读取请求体/复制上传文件的块大小（字节）
+PDF_WRITE_BUFFER_SIZE = 1 << 20  # 写入拆分后PDF时的文件缓冲区大小（字节）
+SESSION_WRITE_BUFFER_SIZE = 64 * 1024  # 写入session.json时的文件缓冲区大小（字节）
+# 相同文件以相同页码范围再次上传时直接使用缓存的转换和拆分结果（会在临时目录中保留用户文件的副本），
+# 默认关闭，可通过环境变量 UPLOAD_CACHE=true 启用
+UPLOAD_CACHE = os.environ.get('UPLOAD_CACHE', '').lower() == 'true'
+UPLOAD_CACHE_TTL = 24 * 3600.0  # 上传缓存的有效期（秒）
+
+# 是否使用 lp -P 直接在原始PDF上选择奇偶页打印（不生成拆分后的PDF）
+# 需要打印队列的CUPS过滤器支持page-ranges，默认关闭，可通过环境变量 LP_PAGE_RANGES=true 启用
+LP_PAGE_RANGES = os.environ.get('LP_PAGE_RANGES', '').lower() == 'true'
+PRINTER_CACHE_TTL = 5.0  # 打印机列表缓存时间（秒）
+DEFAULT_PRINTER_CACHE_TTL = 30.0  # 默认打印机缓存时间（秒），默认打印机很少变化
+JOB_MONITOR_INTERVAL = 1.0  # 后台刷新打印队列的间隔（秒）
+JOB_MONITOR_IDLE_TIMEOUT = 30.0  # 打印机超过该时间无人查询后停止刷新（秒）
+STATUS_CACHE_TTL = 0.3  # /api/print/status 结果的缓存时间（秒）
+SESSION_FILE_CHECK_TTL = 5.0  # 会话PDF文件存在性检查结果的缓存时间（秒）
+SESSION_FLUSH_INTERVAL = 0.5  # 后台写入修改过的session.json的间隔（秒）
+UPLOAD_WORKERS = 4  # 同时在后台处理的异步上传数量
+SESSION_IDLE_TTL = 3600.0  # 会话超过该时间未被访问后从内存中移除（秒），之后访问时重新读取session.json
+SOFFICE_UNO_PORT = int(os.environ.get('SOFFICE_UNO_PORT', 0))  # 常驻LibreOffice监听的UNO端口，0表示每个进程自动选择空闲端口
+SOFFICE_START_TIMEOUT = 20.0  # 等待常驻LibreOffice启动完成的时间（秒）
+SOFFICE_BATCH_WINDOW = 0.1  # 命令行转换时收集同时到达的转换请求的最长等待时间（秒）
+SOFFICE_CONVERT_TIMEOUT = 60  # 命令行转换单个文档的超时时间（秒）
+
+# 可能的LibreOffice路径（PATH中找不到soffice时依次检查）
+SOFFICE_PATHS = [
+    '/Applications/LibreOffice.app/Contents/MacOS/soffice',  # macOS标准位置
+    '/usr/bin/soffice',  # Linux标准位置
+    '/usr/local/bin/soffice',  # 其他可能位置
+]
+
+# 预编译的正则表达式
+# lpstat -a 输出：中文系统 "xxx 正在接受请求"，英文系统 "xxx accepting requests"
+_RE_ACCEPT_CN = re.compile(r'^(.*?)\s*(正在接受请求|自从.*开始接受请求)')
+_RE_ACCEPT_EN = re.compile(r'^(.*?) accepting requests')
+# lpstat -l -o 详细信息中的页面进度
+_RE_PROC_PAGE = re.compile(r'processing\s+page\s+(\d+)', re.IGNORECASE)
+_RE_PROC_CN = re.compile(r'正在处理.*?第\s*(\d+)\s*页')
+_RE_PAGE_OF = re.compile(r'page\s+(\d+)\s+of\s+(\d+)', re.IGNORECASE)
+# lp 输出："request id is printer-name-123 (1 file(s))"
+_RE_REQID = re.compile(r'request id is\s+(\S+)', re.IGNORECASE)
+
+# 打印机列表和默认打印机的缓存（ts为time.monotonic()时间戳）
+_PRINTERS_CACHE = {'ts': 0.0, 'data': None}
+_DEFAULT_PRINTER_CACHE = {'ts': 0.0, 'data': None}
+
+# 后台打印队列监控：打印机名称（None表示全部）-> {'result': 查询结果, 'last_access': 最近查询时间}
+_JOB_SNAPSHOTS = {}
+_JOB_MONITOR_LOCK = threading.Lock()
+_JOB_MONITOR = {'thread': None}
+
+# 常驻的LibreOffice进程（通过UNO socket接收转换请求），启动失败后不再重试
+_SOFFICE_SERVER = {'process': None, 'failed': False, 'profile_dir': None, 'port': None}
+_SOFFICE_LOCK = threading.Lock()
+# 等待通过soffice命令行转换的文档，由后台线程合并为一次soffice调用
+_SOFFICE_BATCH = {'pending': [], 'running': 0, 'thread': None}  # running为正在转换的批次中的文档数
+_SOFFICE_BATCH_READY = threading.Condition()
+
+# 打印状态查询结果的缓存：(打印机名称, 会话ID) -> (time.monotonic()时间戳, 查询结果)
+# 同一个键的并发请求通过各自的锁合并为一次查询
+_STATUS_CACHE = {}
+_STATUS_LOCKS = {}
+_STATUS_LOCKS_LOCK = threading.Lock()
+
+# 会话信息的内存缓存：会话ID -> 会话信息（session.json仅用于进程重启后恢复）
+SESSIONS = {}
+_SESSIONS_LOCK = threading.RLock()
+# 会话最后一次被访问的时间：会话ID -> time.monotonic()时间戳
+_SESSION_ACCESS = {}
+# 会话PDF文件是否存在的检查结果：会话ID -> (time.monotonic()时间戳, 奇数页文件存在, 偶数页文件存在)
+_SESSION_FILE_CHECKS = {}
+# 已修改但尚未写入session.json的会话ID，由后台线程定期写入，请求不等待磁盘写入
+_DIRTY_SESSIONS = set()
+_SESSION_FLUSH_LOCK = threading.Lock()
+_SESSION_FLUSHER = {'thread': None}
+# 异步上传的处理状态：会话ID -> {'status': 'processing'|'done'|'error', 'result': 响应内容, 'code': HTTP状态码}
+_UPLOAD_JOBS = {}
+
+# 每个线程各自的pycups连接（cups.Connection不是线程安全的）
+_CUPS_LOCAL = threading.local()
+# 记录当前线程是否已初始化COM（Windows上调用Word需要在每个线程中初始化一次）
+_COM_LOCAL = threading.local()
+
+# 调用lp/lpstat/soffice等外部命令时使用的环境变量（启动时计算一次，所有调用共享，不要修改）
+# 在macOS上，确保PATH包含/usr/bin
+_SUBPROCESS_ENV = dict(os.environ)
+if '/usr/bin' not in _SUBPROCESS_ENV.get('PATH', ''):
+    _SUBPROCESS_ENV['PATH'] = '/usr/bin:/usr/local/bin:/bin:/usr/sbin:/sbin:' + _SUBPROCESS_ENV.get('PATH', '')
+
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE
+
+# 使用内存文件系统时，中间文件不经过磁盘（内存占用约为同时存在的会话文件总大小）
+if USE_TMPFS and sys.platform == 'linux' and os.path.isdir('/dev/shm'):
+    import fcntl
+    os.makedirs(TMPFS_ROOT, exist_ok=True)
+    # 第一个启动的实例持有锁并使用固定的main目录，程序退出时不删除，重启后仍可恢复会话（断线重连、崩溃恢复）；
+    # 锁文件在进程退出时自动释放，不需要清理
+    _tmpfs_lock = open(os.path.join(TMPFS_ROOT, '.lock'), 'w')
+    try:
+        fcntl.flock(_tmpfs_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        _tmpfs_dir = os.path.join(TMPFS_ROOT, 'main')
+        # 上传的原文件只在处理请求期间使用，删除上次异常退出时留下的文件
+        shutil.rmtree(os.path.join(_tmpfs_dir, 'uploads'), ignore_errors=True)
+    except BlockingIOError:
+        # 同时运行的其他实例使用以进程ID命名的目录，程序退出时删除（这些实例重启后不能恢复会话）
+        _tmpfs_lock.close()
+        _tmpfs_dir = os.path.join(TMPFS_ROOT, str(os.getpid()))
+        atexit.register(shutil.rmtree, _tmpfs_dir, ignore_errors=True)
+    UPLOAD_FOLDER = os.path.join(_tmpfs_dir, 'uploads')
+    TEMP_FOLDER = os.path.join(_tmpfs_dir, 'temp')
+    # 删除异常退出（未执行atexit）的其他实例留下的目录
+    with os.scandir(TMPFS_ROOT) as entries:
+        for entry in entries:
+            if not entry.name.isdigit() or int(entry.name) == os.getpid():
+                continue
+            try:
+                os.kill(int(entry.name), 0)
+            except ProcessLookupError:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass  # 进程存在（没有权限发送信号）
 
 # 如果通过app.config设置，则使用配置值（用于打包后的应用）
 if hasattr(app, 'config') and app.config.get('UPLOAD_FOLDER'):
     UPLOAD_FOLDER = app.config.get('UPLOAD_FOLDER')
 if hasattr(app, 'config') and app.config.get('TEMP_FOLDER'):
     TEMP_FOLDER = app.config.get('TEMP_FOLDER')
+# 上传缓存放在临时目录中（与会话文件在同一文件系统，缓存通过硬链接共享会话文件，不额外占用空间）
+CACHE_FOLDER = os.path.join(TEMP_FOLDER, '.cache')  # 以.开头，不会与会话目录（mkdtemp生成）重名
 
 # 确保文件夹存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(TEMP_FOLDER, exist_ok=True)
+if UPLOAD_CACHE:
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+TEMP_FOLDER_PATH = Path(TEMP_FOLDER)
+
+# 后台删除已清理会话的目录
+_CLEANUP_WORKER = ThreadPoolExecutor(max_workers=1)
+# 后台处理异步上传的文件（Word转换和PDF拆分）
+_UPLOAD_WORKER = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS)
+# 删除上次运行时未删除完的会话目录
+# 用scandir遍历，DirEntry自带文件类型，不需要为每个会话目录额外调用stat
+with os.scandir(TEMP_FOLDER) as _entries:
+    for _entry in _entries:
+        if _entry.name.endswith('.del') and _entry.is_dir(follow_symlinks=False):
+            _CLEANUP_WORKER.submit(shutil.rmtree, _entry.path, ignore_errors=True)
 
 
-def format_error_message(error, include_traceback=True):
+def format_error_message(error, include_traceback=None):
     """
     格式化错误信息，包括堆栈跟踪
     
     Args:
         error: 异常对象
-        include_traceback: 是否包含堆栈跟踪
+        include_traceback: 是否包含堆栈跟踪，None表示由INCLUDE_TRACEBACK决定
         
     Returns:
         dict: 包含错误信息的字典
     """
-    # 检查是否为调试模式（检查app.debug或全局DEBUG_MODE）
-    is_debug = app.debug or DEBUG_MODE
+    if include_traceback is None:
+        include_traceback = INCLUDE_TRACEBACK
     
     error_info = {
         'error': str(error),
         'type': type(error).__name__
     }
     
-    if include_traceback and is_debug:
-        error_info['traceback'] = traceback.format_exc()
-        error_info['full_traceback'] = traceback.format_exception(
-            type(error), error, error.__traceback__
-        )
+    # 非调试模式下不格式化堆栈，省去遍历调用栈的开销
+    if include_traceback:
+        # 只格式化一次堆栈，字符串形式由列表拼接得到
+        tb_list = traceback.format_exception(type(error), error, error.__traceback__)
+        error_info['traceback'] = ''.join(tb_list)
+        error_info['full_traceback'] = tb_list
     
     return error_info
 
 
+def _error_response(error, message, status=500):
+    """
+    生成错误响应（调试模式下附带堆栈跟踪）
+    
+    Args:
+        error: 异常对象
+        message: 错误信息前缀，如 "打印错误"
+        status: HTTP状态码
+        
+    Returns:
+        tuple: (json响应, 状态码)
+    """
+    return jsonify(_error_payload(error, message)), status
+
+
+def _error_payload(error, message):
+    """
+    生成错误响应的内容（不依赖请求上下文，后台线程中也可以使用）
+    
+    Args:
+        error: 异常对象
+        message: 错误信息前缀，如 "打印错误"
+        
+    Returns:
+        dict: 错误信息
+    """
+    error_info = format_error_message(error)
+    response_data = {
+        'error': f'{message}: {error_info["error"]}',
+        'error_type': error_info['type']
+    }
+    if 'traceback' in error_info:
+        response_data['traceback'] = error_info['traceback']
+    return response_data
+
+
 def allowed_file(filename):
     """
     检查文件扩展名是否允许
@@ -78,9 +327,102 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _display_filename(filename):
+    """
+    去掉客户端文件名中的目录部分（只用于显示和判断扩展名，不作为保存路径）
+    
+    Args:
+        filename: 客户端提交的文件名
+        
+    Returns:
+        str: 文件名
+    """
+    return os.path.basename(filename.replace('\\', '/'))
+
+
+def save_uploaded_file(upload_folder):
+    """
+    将请求中的上传文件保存到上传目录
+    
+    安装了streaming-form-data时，直接从请求体流式解析multipart数据并写入磁盘，
+    不经过Werkzeug的表单解析；否则回退到request.files。
+    文件保存为上传目录中随机生成的文件名（只保留扩展名），客户端提交的文件名不会用作路径。
+    
+    Args:
+        upload_folder: 上传目录
+        
+    Returns:
+        tuple: (文件名, 保存路径, 页码范围, 文件内容的blake2b哈希)。请求中没有file字段时文件名为None，
+               未选择文件时文件名为空字符串，扩展名不允许时不保存文件，这三种情况下保存路径和哈希均为None
+    """
+    # 保存的同时计算哈希，不需要再读一遍文件
+    hasher = hashlib.blake2b(digest_size=16)
+    try:
+        from streaming_form_data import StreamingFormDataParser
+        from streaming_form_data.targets import FileTarget, ValueTarget
+    except ImportError:
+        file = request.files.get('file')
+        page_range = request.form.get('page_range', '').strip()
+        if file is None or file.filename == '':
+            return (file.filename if file else None), None, page_range, None
+        filename = _display_filename(file.filename)
+        # 先检查扩展名，不允许的文件不写入
+        if not allowed_file(filename):
+            return filename, None, page_range, None
+        fd, upload_path = tempfile.mkstemp(suffix='.' + filename.rsplit('.', 1)[1].lower(), dir=upload_folder)
+        # 用较大的块复制（file.save默认每次只复制16KiB）
+        with open(fd, 'wb', buffering=PDF_WRITE_BUFFER_SIZE) as dst:
+            while True:
+                chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                dst.write(chunk)
+        return filename, upload_path, page_range, hasher.hexdigest()
+    
+    if request.mimetype != 'multipart/form-data':
+        return None, None, '', None
+    
+    # 先写入随机命名的临时文件，解析完成拿到原始文件名并检查扩展名后再重命名
+    fd, part_path = tempfile.mkstemp(suffix='.part', dir=upload_folder)
+    os.close(fd)
+    
+    # validator会收到写入文件的每一块数据，用来计算哈希
+    file_target = FileTarget(part_path, validator=hasher.update)
+    page_range_target = ValueTarget()
+    parser = StreamingFormDataParser(headers=request.headers)
+    parser.register('file', file_target)
+    parser.register('page_range', page_range_target)
+    
+    try:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+    except Exception:
+        os.remove(part_path)
+        raise
+    
+    filename = file_target.multipart_filename
+    page_range = page_range_target.value.decode('utf-8', errors='replace').strip()
+    if filename:
+        filename = _display_filename(filename)
+    if not filename or not allowed_file(filename):
+        os.remove(part_path)
+        return filename, None, page_range, None
+    
+    # 由mkstemp创建目标文件，保证文件名唯一（同名文件同时上传时互不覆盖）
+    fd, upload_path = tempfile.mkstemp(suffix='.' + filename.rsplit('.', 1)[1].lower(), dir=upload_folder)
+    os.close(fd)
+    os.replace(part_path, upload_path)
+    return filename, upload_path, page_range, hasher.hexdigest()
+
+
+@lru_cache(maxsize=1)
 def find_lpstat_command():
     """
-    查找lpstat命令的完整路径
+    查找lpstat命令的完整路径（结果会被缓存）
     
     Returns:
         str: lpstat命令的完整路径，如果找不到则返回None
@@ -93,52 +435,169 @@ def find_lpstat_command():
     ]
     
     for path in possible_paths:
-        if os.path.exists(path) and os.access(path, os.X_OK):
+        if os.access(path, os.X_OK):
             return path
     
-    # 尝试使用which命令查找（使用shell环境）
-    try:
-        # 在macOS上，使用/bin/sh来确保PATH正确
-        result = subprocess.run(
-            ['/bin/sh', '-c', 'which lpstat'],
-            capture_output=True,
-            text=True,
-            timeout=5,
-            env=os.environ.copy()
-        )
-        if result.returncode == 0:
-            found_path = result.stdout.strip()
-            if found_path and os.path.exists(found_path):
-                return found_path
-    except:
-        pass
+    # 在PATH中查找（不启动shell进程）
+    return shutil.which('lpstat', path=_SUBPROCESS_ENV['PATH'])
+
+
+@lru_cache(maxsize=1)
+def find_soffice_command():
+    """
+    查找LibreOffice（soffice）命令的完整路径（结果会被缓存）
+    
+    Returns:
+        str: soffice命令的完整路径，如果找不到则返回None
+    """
+    found_path = shutil.which('soffice', path=_SUBPROCESS_ENV['PATH'])
+    if found_path:
+        return found_path
+    
+    for path in SOFFICE_PATHS:
+        if os.access(path, os.X_OK):
+            return path
     
     return None
 
 
+@lru_cache(maxsize=None)
+def _import_optional(module_name):
+    """
+    导入可选依赖模块（只在第一次用到时导入，结果会被缓存，未安装时不会重复尝试）
+    
+    Args:
+        module_name: 模块名，如 "win32com.client"
+        
+    Returns:
+        module: 导入的模块，未安装时返回None
+    """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+
+def _ensure_com_initialized():
+    """
+    在当前线程中初始化COM（每个线程只初始化一次）
+    
+    Returns:
+        bool: 是否可以使用COM（非Windows或未安装pywin32时返回False）
+    """
+    if getattr(_COM_LOCAL, 'initialized', False):
+        return True
+    pythoncom = _import_optional('pythoncom')
+    if pythoncom is None:
+        return False
+    pythoncom.CoInitialize()
+    _COM_LOCAL.initialized = True
+    return True
+
+
+def get_cups_connection():
+    """
+    获取当前线程的CUPS连接（需要安装pycups）
+    
+    Returns:
+        cups.Connection: CUPS连接，未安装pycups或无法连接CUPS时返回None
+    """
+    cups = _import_optional('cups')
+    if cups is None:
+        return None
+    
+    conn = getattr(_CUPS_LOCAL, 'conn', None)
+    if conn is None:
+        try:
+            conn = cups.Connection()
+        except Exception:
+            return None
+        _CUPS_LOCAL.conn = conn
+    return conn
+
+
+def reset_cups_connection():
+    """
+    丢弃当前线程的CUPS连接（连接失效时调用，下次会重新连接）
+    """
+    _CUPS_LOCAL.conn = None
+
+
+def _cache_is_fresh(cache, ttl=PRINTER_CACHE_TTL):
+    """
+    检查缓存是否仍在有效期内
+    
+    Args:
+        cache: 包含ts和data的缓存字典
+        ttl: 缓存有效时间（秒）
+        
+    Returns:
+        bool: 如果缓存有效则返回True
+    """
+    return cache['ts'] > 0 and time.monotonic() - cache['ts'] < ttl
+
+
+def invalidate_printer_cache():
+    """
+    清除打印机相关的缓存（命令路径、打印机列表和默认打印机）
+    """
+    find_lpstat_command.cache_clear()
+    find_lp_command.cache_clear()
+    find_soffice_command.cache_clear()
+    _PRINTERS_CACHE.update(ts=0.0, data=None)
+    _DEFAULT_PRINTER_CACHE.update(ts=0.0, data=None)
+
+
 def get_default_printer():
     """
-    获取默认打印机名称
+    获取默认打印机名称（结果会缓存DEFAULT_PRINTER_CACHE_TTL秒）
+    
+    Returns:
+        str: 默认打印机名称，如果没有则返回None
+    """
+    if _cache_is_fresh(_DEFAULT_PRINTER_CACHE, DEFAULT_PRINTER_CACHE_TTL):
+        return _DEFAULT_PRINTER_CACHE['data']
+    
+    default_printer = _query_default_printer()
+    _DEFAULT_PRINTER_CACHE.update(ts=time.monotonic(), data=default_printer)
+    return default_printer
+
+
+def _query_default_printer():
+    """
+    查询默认打印机名称（优先使用pycups，否则使用lpstat；Windows上使用win32print）
     
     Returns:
         str: 默认打印机名称，如果没有则返回None
     """
+    conn = get_cups_connection()
+    if conn is not None:
+        try:
+            return conn.getDefault()
+        except Exception:
+            reset_cups_connection()
+    
+    if sys.platform == 'win32':
+        # 直接调用Win32 API（需要pywin32），不启动外部进程
+        win32print = _import_optional('win32print')
+        if win32print is None:
+            return None
+        try:
+            return win32print.GetDefaultPrinter() or None
+        except Exception:
+            return None
+    
     lpstat_command = find_lpstat_command()
     if not lpstat_command:
         return None
     
-    # 在macOS上，确保PATH包含/usr/bin
-    env = os.environ.copy()
-    if '/usr/bin' not in env.get('PATH', ''):
-        env['PATH'] = '/usr/bin:/usr/local/bin:/bin:/usr/sbin:/sbin:' + env.get('PATH', '')
-    
     try:
         result = subprocess.run(
             [lpstat_command, '-d'],
             capture_output=True,
             text=True,
             check=True,
-            env=env
+            env=_SUBPROCESS_ENV
         )
         for line in result.stdout.split('\n'):
             if 'system default destination:' in line.lower():
@@ -152,19 +611,36 @@ def get_default_printer():
 
 def get_available_printers():
     """
-    获取系统可用的打印机列表
+    获取系统可用的打印机列表（结果会缓存PRINTER_CACHE_TTL秒）
     
     Returns:
         list: 打印机名称列表
     """
+    if _cache_is_fresh(_PRINTERS_CACHE):
+        return list(_PRINTERS_CACHE['data'])
+    
+    printers = _query_available_printers()
+    _PRINTERS_CACHE.update(ts=time.monotonic(), data=list(printers))
+    return printers
+
+
+def _query_available_printers():
+    """
+    查询系统可用的打印机列表（优先使用pycups，否则使用lpstat或Windows的win32print/WMI）
+    
+    Returns:
+        list: 打印机名称列表
+    """
+    conn = get_cups_connection()
+    if conn is not None:
+        try:
+            return list(conn.getPrinters())
+        except Exception:
+            reset_cups_connection()
+    
     printers = []
     lpstat_command = find_lpstat_command()
     
-    # 在macOS上，确保PATH包含/usr/bin
-    env = os.environ.copy()
-    if '/usr/bin' not in env.get('PATH', ''):
-        env['PATH'] = '/usr/bin:/usr/local/bin:/bin:/usr/sbin:/sbin:' + env.get('PATH', '')
-    
     if lpstat_command:
         try:
             # 方法1: 使用 lpstat -a 获取所有接受打印任务的打印机
@@ -173,7 +649,7 @@ def get_available_printers():
                 capture_output=True,
                 text=True,
                 check=True,
-                env=env
+                env=_SUBPROCESS_ENV
             )
             for line in result.stdout.splitlines():
                 line = line.strip()
@@ -181,10 +657,10 @@ def get_available_printers():
                     continue
                 
                 # 中文系统：匹配行首到"正在接受请求"
-                match = re.match(r'^(.*?)\s*(正在接受请求|自从.*开始接受请求)', line)
+                match = _RE_ACCEPT_CN.match(line)
                 # 英文系统：匹配行首到"accepting requests"
                 if not match:
-                    match = re.match(r'^(.*?) accepting requests', line)
+                    match = _RE_ACCEPT_EN.match(line)
                 
                 if match:
                     printer_name = match.group(1).strip()
@@ -201,7 +677,7 @@ def get_available_printers():
                     capture_output=True,
                     text=True,
                     check=True,
-                    env=env
+                    env=_SUBPROCESS_ENV
                 )
                 for line in result.stdout.split('\n'):
                     if line.startswith('printer'):
@@ -213,7 +689,31 @@ def get_available_printers():
             except:
                 pass
     
-    # 如果还是失败，尝试Windows方法
+    # 如果还是失败，尝试Windows方法：直接调用Win32 API枚举本地和网络打印机（需要pywin32）
+    win32print = _import_optional('win32print') if not printers and sys.platform == 'win32' else None
+    if win32print is not None:
+        try:
+            flags = win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
+            # level 1 返回 (flags, description, name, comment)
+            for printer in win32print.EnumPrinters(flags, None, 1):
+                if printer[2] and printer[2] not in printers:
+                    printers.append(printer[2])
+        except Exception:
+            pass
+    
+    # 其次通过WMI COM接口查询（需要pywin32）
+    win32com_client = _import_optional('win32com.client') if not printers and sys.platform == 'win32' else None
+    if win32com_client is not None:
+        try:
+            _ensure_com_initialized()
+            wmi = win32com_client.GetObject('winmgmts:')
+            for printer in wmi.InstancesOf('Win32_Printer'):
+                if printer.Name and printer.Name not in printers:
+                    printers.append(printer.Name)
+        except:
+            pass
+    
+    # 最后尝试wmic命令（Windows 10/11中已弃用）
     if not printers:
         try:
             result = subprocess.run(
@@ -221,7 +721,7 @@ def get_available_printers():
                 capture_output=True,
                 text=True,
                 check=True,
-                env=os.environ.copy()
+                env=_SUBPROCESS_ENV
             )
             for line in result.stdout.split('\n'):
                 line = line.strip()
@@ -233,203 +733,603 @@ def get_available_printers():
     return printers
 
 
-def convert_word_to_pdf(word_path, output_dir):
+def _connect_soffice_server(uno):
     """
-    将Word文档转换为PDF
+    连接常驻LibreOffice进程并返回Desktop对象
     
     Args:
-        word_path: Word文档路径
-        output_dir: 输出目录
+        uno: uno模块
         
     Returns:
-        str: 转换后的PDF文件路径
-        
-    Raises:
-        Exception: 转换失败时抛出异常
+        Desktop对象
     """
-    pdf_path = os.path.join(output_dir, 'converted.pdf')
-    
-    # 方法1: 尝试使用LibreOffice（推荐，格式保持最好）
-    # 尝试多个可能的LibreOffice路径
-    soffice_paths = [
-        'soffice',  # 标准PATH中的命令
-        '/Applications/LibreOffice.app/Contents/MacOS/soffice',  # macOS标准位置
-        '/usr/bin/soffice',  # Linux标准位置
-        '/usr/local/bin/soffice',  # 其他可能位置
-    ]
-    
-    for soffice_cmd in soffice_paths:
-        try:
-            # 检查命令是否存在
-            if soffice_cmd != 'soffice':
-                if not os.path.exists(soffice_cmd):
-                    continue
-            
-            result = subprocess.run(
-                [soffice_cmd, '--headless', '--convert-to', 'pdf', '--outdir', output_dir, word_path],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=60
-            )
-            # LibreOffice输出的PDF文件名可能与输入文件名相同
-            base_name = os.path.splitext(os.path.basename(word_path))[0]
-            possible_pdf = os.path.join(output_dir, f'{base_name}.pdf')
-            if os.path.exists(possible_pdf):
-                if possible_pdf != pdf_path:
-                    os.rename(possible_pdf, pdf_path)
-                return pdf_path
-            # 如果没找到预期的文件名，检查输出目录中是否有PDF文件
-            for file in os.listdir(output_dir):
-                if file.endswith('.pdf'):
-                    found_pdf = os.path.join(output_dir, file)
-                    if found_pdf != pdf_path:
-                        os.rename(found_pdf, pdf_path)
-                    return pdf_path
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-            continue
-    
-    # 方法2: 尝试使用docx2pdf库（需要安装docx2pdf）
-    try:
-        from docx2pdf import convert
-        convert(word_path, pdf_path)
-        if os.path.exists(pdf_path):
-            return pdf_path
-    except ImportError:
-        pass
-    except Exception:
-        pass
-    
-    # 方法3: 尝试使用Windows的Word COM对象（仅Windows）
-    try:
-        import win32com.client
-        word_app = win32com.client.Dispatch('Word.Application')
-        word_app.Visible = False
-        doc = word_app.Documents.Open(os.path.abspath(word_path))
-        doc.SaveAs(os.path.abspath(pdf_path), FileFormat=17)  # 17 = PDF格式
-        doc.Close()
-        word_app.Quit()
-        if os.path.exists(pdf_path):
-            return pdf_path
-    except:
-        pass
-    
-    # 如果所有方法都失败，抛出异常
-    raise Exception('无法转换Word文档为PDF。请确保已安装LibreOffice（推荐）或Microsoft Word（Windows）')
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext(
+        'com.sun.star.bridge.UnoUrlResolver', local_ctx
+    )
+    ctx = resolver.resolve(
+        f'uno:socket,host=127.0.0.1,port={_SOFFICE_SERVER["port"]};urp;StarOffice.ComponentContext'
+    )
+    return ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
 
 
-def parse_page_range(page_range_str, total_pages):
+def _reserve_soffice_port():
     """
-    解析页码范围字符串，如 "1,2,3-5,7,10-20"
+    选择常驻LibreOffice监听的端口
     
-    Args:
-        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"，空字符串表示全部页面
-        total_pages: PDF总页数
-        
     Returns:
-        list: 页面索引列表（从0开始），已排序且去重
+        int: 端口号（SOFFICE_UNO_PORT为0时由系统分配空闲端口），设置的端口已被占用时返回None
     """
-    if not page_range_str or not page_range_str.strip():
-        # 如果没有指定页码范围，返回所有页面
-        return list(range(total_pages))
-    
-    page_indices = set()
-    parts = page_range_str.replace(' ', '').split(',')
-    
-    for part in parts:
-        if not part:
-            continue
-        
-        if '-' in part:
-            # 处理范围，如 "3-5"
-            try:
-                start, end = part.split('-', 1)
-                start_page = int(start) - 1  # 转换为0-based索引
-                end_page = int(end) - 1
-                
-                # 确保范围有效
-                if start_page < 0:
-                    start_page = 0
-                if end_page >= total_pages:
-                    end_page = total_pages - 1
-                if start_page <= end_page:
-                    page_indices.update(range(start_page, end_page + 1))
-            except ValueError:
-                raise ValueError(f'无效的页码范围格式: {part}')
-        else:
-            # 处理单个页码，如 "1"
-            try:
-                page_num = int(part) - 1  # 转换为0-based索引
-                if 0 <= page_num < total_pages:
-                    page_indices.add(page_num)
-            except ValueError:
-                raise ValueError(f'无效的页码: {part}')
-    
-    # 返回排序后的列表
-    return sorted(list(page_indices))
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('127.0.0.1', SOFFICE_UNO_PORT))
+        except OSError:
+            return None
+        return sock.getsockname()[1]
 
 
-def split_pdf_pages(pdf_path, output_dir, page_range_str=None):
+def _start_soffice_server(uno):
     """
-    将PDF分为奇数页和偶数页两个文件
+    启动常驻的LibreOffice进程并等待其可以连接（调用方需持有_SOFFICE_LOCK）
     
     Args:
-        pdf_path: 原始PDF文件路径
-        output_dir: 输出目录
-        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"，None或空字符串表示全部页面
+        uno: uno模块
         
     Returns:
-        tuple: (奇数页文件路径, 偶数页文件路径, 总页数, 选择的页数)
+        Desktop对象，启动失败时返回None
     """
-    reader = PdfReader(pdf_path)
-    total_pages = len(reader.pages)
-    
-    # 解析页码范围
-    selected_indices = parse_page_range(page_range_str, total_pages)
-    selected_count = len(selected_indices)
+    # 使用本进程独立的用户配置目录，避免与用户正在使用的LibreOffice、一次性转换进程
+    # 或同一台机器上的其他实例共用配置目录（同一配置目录被多个进程同时使用会导致崩溃）
+    profile_dir = Path(tempfile.gettempdir()) / f'print_auto_soffice_profile_{os.getpid()}'
+    _SOFFICE_SERVER['profile_dir'] = profile_dir
     
-    if selected_count == 0:
-        raise ValueError('没有选择任何页面')
-    
-    # 根据选择的页面索引，提取对应的页面
-    selected_pages = [reader.pages[i] for i in selected_indices]
+    soffice_cmd = find_soffice_command()
+    if not soffice_cmd:
+        return None
     
-    # 在选择的页面中，重新划分奇偶页（基于在原始文档中的位置）
-    # 注意：这里基于选择的页面在原始文档中的实际页码位置来判断奇偶
-    odd_pages = []
-    even_pages = []
+    # 端口已被其他程序（其他实例的LibreOffice、unoserver等）占用时不启动，
+    # 否则下面的连接会连到别人的LibreOffice进程
+    port = _reserve_soffice_port()
+    if port is None:
+        return None
+    _SOFFICE_SERVER['port'] = port
     
-    for idx in selected_indices:
-        # idx是0-based索引，所以第1页是idx=0（奇数），第2页是idx=1（偶数）
-        if idx % 2 == 0:  # 原始文档中的奇数页（1, 3, 5, ...）
-            odd_pages.append(reader.pages[idx])
-        else:  # 原始文档中的偶数页（2, 4, 6, ...）
-            even_pages.append(reader.pages[idx])
+    try:
+        process = subprocess.Popen(
+            [
+                soffice_cmd, '--headless', '--invisible', '--nologo', '--norestore', '--nodefault',
+                f'-env:UserInstallation={profile_dir.as_uri()}',
+                f'--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ServiceManager',
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=_SUBPROCESS_ENV
+        )
+    except OSError:
+        return None
     
-    # 创建偶数页PDF（从小到大）
-    even_writer = PdfWriter()
-    for page in even_pages:
-        even_writer.add_page(page)
+    # 等待LibreOffice开始监听端口
+    deadline = time.monotonic() + SOFFICE_START_TIMEOUT
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            desktop = _connect_soffice_server(uno)
+            _SOFFICE_SERVER['process'] = process
+            return desktop
+        except Exception:
+            time.sleep(0.5)
     
-    even_path = os.path.join(output_dir, 'even_pages.pdf')
-    with open(even_path, 'wb') as f:
-        even_writer.write(f)
+    process.kill()
+    process.wait()
     
-    # 创建奇数页PDF（从大到小）
-    odd_writer = PdfWriter()
-    for page in reversed(odd_pages):
-        odd_writer.add_page(page)
+    return None
+
+
+def stop_soffice_server():
+    """
+    结束常驻的LibreOffice进程（程序退出时自动调用）
+    """
+    process = _SOFFICE_SERVER['process']
+    _SOFFICE_SERVER['process'] = None
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    
+    # 删除本进程的LibreOffice配置目录
+    profile_dir = _SOFFICE_SERVER.get('profile_dir')
+    if profile_dir is not None:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+atexit.register(stop_soffice_server)
+
+
+def convert_with_soffice_server(word_path, pdf_path):
+    """
+    通过常驻LibreOffice进程（UNO socket）将Word文档转换为PDF
+    首次调用时启动LibreOffice，之后的转换不再需要冷启动
+    
+    Args:
+        word_path: Word文档路径
+        pdf_path: 输出PDF文件路径
+        
+    Returns:
+        bool: 是否转换成功（未安装uno模块或LibreOffice时返回False）
+    """
+    if _SOFFICE_SERVER['failed']:
+        return False
+    
+    try:
+        import uno
+        from com.sun.star.beans import PropertyValue
+    except ImportError:
+        _SOFFICE_SERVER['failed'] = True
+        return False
+    
+    # UNO连接不支持多个请求同时转换，串行处理
+    with _SOFFICE_LOCK:
+        process = _SOFFICE_SERVER['process']
+        desktop = None
+        if process is not None and process.poll() is None:
+            try:
+                desktop = _connect_soffice_server(uno)
+            except Exception:
+                stop_soffice_server()
+        if desktop is None:
+            desktop = _start_soffice_server(uno)
+            if desktop is None:
+                _SOFFICE_SERVER['failed'] = True
+                return False
+        
+        doc = None
+        try:
+            doc = desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(word_path)), '_blank', 0,
+                (PropertyValue(Name='Hidden', Value=True),)
+            )
+            doc.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                (PropertyValue(Name='FilterName', Value='writer_pdf_Export'),)
+            )
+        except Exception:
+            return False
+        finally:
+            if doc is not None:
+                try:
+                    doc.close(True)
+                except Exception:
+                    pass
+    
+    return os.path.exists(pdf_path)
+
+
+def _soffice_batch_loop(soffice_cmd):
+    """
+    后台转换线程：收集SOFFICE_BATCH_WINDOW秒内到达的转换请求，用一次soffice调用转换全部文档
+    
+    Args:
+        soffice_cmd: soffice命令路径
+    """
+    batch = []
+    try:
+        while True:
+            with _SOFFICE_BATCH_READY:
+                while not _SOFFICE_BATCH['pending']:
+                    _SOFFICE_BATCH_READY.wait()
+            
+            # 等待同时上传的其他文档加入本批次
+            time.sleep(SOFFICE_BATCH_WINDOW)
+            
+            with _SOFFICE_BATCH_READY:
+                # 输出文件名由输入文件名决定，同名文档留到下一批次，避免输出互相覆盖
+                batch = []
+                rest = []
+                names = set()
+                for item in _SOFFICE_BATCH['pending']:
+                    name = os.path.splitext(os.path.basename(item['word_path']))[0]
+                    if name in names:
+                        rest.append(item)
+                    else:
+                        names.add(name)
+                        batch.append(item)
+                _SOFFICE_BATCH['pending'] = rest
+                _SOFFICE_BATCH['running'] = len(batch)
+            
+            _run_soffice_batch(soffice_cmd, batch)
+            batch = []
+    finally:
+        # 线程因意外异常退出时，让等待中的请求立即失败，并清空线程记录，下一个请求会重新启动线程
+        with _SOFFICE_BATCH_READY:
+            failed = batch + _SOFFICE_BATCH['pending']
+            _SOFFICE_BATCH['pending'] = []
+            _SOFFICE_BATCH['running'] = 0
+            _SOFFICE_BATCH['thread'] = None
+        for item in failed:
+            item['event'].set()
+
+
+def _run_soffice_batch(soffice_cmd, batch):
+    """
+    用一次soffice调用转换一批Word文档，并通知等待的请求
+    
+    Args:
+        soffice_cmd: soffice命令路径
+        batch: 转换请求列表
+    """
+    batch_dir = None
+    try:
+        batch_dir = tempfile.mkdtemp(prefix='soffice_', dir=TEMP_FOLDER)
+        subprocess.run(
+            [soffice_cmd, '--headless', '--convert-to', 'pdf', '--outdir', batch_dir]
+            + [item['word_path'] for item in batch],
+            capture_output=True,
+            timeout=SOFFICE_CONVERT_TIMEOUT * len(batch),
+            env=_SUBPROCESS_ENV
+        )
+        # LibreOffice输出的PDF文件名固定为：输入文件名（去掉扩展名）+ .pdf
+        for item in batch:
+            base_name = os.path.splitext(os.path.basename(item['word_path']))[0]
+            expected_pdf = os.path.join(batch_dir, f'{base_name}.pdf')
+            if os.path.isfile(expected_pdf):
+                os.replace(expected_pdf, item['pdf_path'])
+                item['ok'] = True
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    finally:
+        if batch_dir is not None:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+        for item in batch:
+            item['event'].set()
+
+
+def convert_with_soffice_cli(soffice_cmd, word_path, pdf_path):
+    """
+    通过soffice命令行将Word文档转换为PDF
+    同时到达的多个请求合并为一次soffice调用，只需要启动一次LibreOffice
+    
+    Args:
+        soffice_cmd: soffice命令路径
+        word_path: Word文档路径
+        pdf_path: 输出PDF文件路径
+        
+    Returns:
+        bool: 是否转换成功
+    """
+    item = {'word_path': word_path, 'pdf_path': pdf_path, 'event': threading.Event(), 'ok': False}
+    with _SOFFICE_BATCH_READY:
+        _SOFFICE_BATCH['pending'].append(item)
+        # 最长等待时间：排在前面的文档（包括正在转换的批次）和本文档都按单个文档的超时时间计算
+        timeout = SOFFICE_BATCH_WINDOW + SOFFICE_CONVERT_TIMEOUT * (len(_SOFFICE_BATCH['pending']) + _SOFFICE_BATCH['running'])
+        if _SOFFICE_BATCH['thread'] is None:
+            thread = threading.Thread(
+                target=_soffice_batch_loop, args=(soffice_cmd,), name='soffice-batch', daemon=True
+            )
+            _SOFFICE_BATCH['thread'] = thread
+            thread.start()
+        _SOFFICE_BATCH_READY.notify()
+    
+    if not item['event'].wait(timeout):
+        with _SOFFICE_BATCH_READY:
+            if item in _SOFFICE_BATCH['pending']:
+                _SOFFICE_BATCH['pending'].remove(item)
+        return False
+    return item['ok']
+
+
+def convert_word_to_pdf(word_path, output_dir):
+    """
+    将Word文档转换为PDF
+    
+    Args:
+        word_path: Word文档路径
+        output_dir: 输出目录
+        
+    Returns:
+        str: 转换后的PDF文件路径
+        
+    Raises:
+        Exception: 转换失败时抛出异常
+    """
+    pdf_path = os.path.join(output_dir, 'converted.pdf')
+    
+    # 方法1: 尝试使用LibreOffice（推荐，格式保持最好）
+    # 优先交给常驻的LibreOffice进程转换，避免每次冷启动
+    if convert_with_soffice_server(word_path, pdf_path):
+        return pdf_path
+    
+    # 只调用找到的第一个LibreOffice，避免对每个候选路径都等待超时
+    soffice_cmd = find_soffice_command()
+    if soffice_cmd and convert_with_soffice_cli(soffice_cmd, word_path, pdf_path):
+        return pdf_path
+    
+    # docx2pdf和Word COM在Windows上都通过COM调用Word，转换可能在后台线程中执行，需要先初始化COM
+    if sys.platform == 'win32':
+        _ensure_com_initialized()
+    
+    # 方法2: 尝试使用docx2pdf库（需要安装docx2pdf）
+    docx2pdf = _import_optional('docx2pdf')
+    if docx2pdf is not None:
+        try:
+            docx2pdf.convert(word_path, pdf_path)
+            if os.path.exists(pdf_path):
+                return pdf_path
+        except Exception:
+            pass
+    
+    # 方法3: 尝试使用Windows的Word COM对象（仅Windows）
+    win32com_client = _import_optional('win32com.client') if sys.platform == 'win32' else None
+    if win32com_client is not None:
+        try:
+            word_app = win32com_client.Dispatch('Word.Application')
+            word_app.Visible = False
+            doc = word_app.Documents.Open(os.path.abspath(word_path))
+            doc.SaveAs(os.path.abspath(pdf_path), FileFormat=17)  # 17 = PDF格式
+            doc.Close()
+            word_app.Quit()
+            if os.path.exists(pdf_path):
+                return pdf_path
+        except:
+            pass
+    
+    # 如果所有方法都失败，抛出异常
+    raise Exception('无法转换Word文档为PDF。请确保已安装LibreOffice（推荐）或Microsoft Word（Windows）')
+
+
+@lru_cache(maxsize=512)
+def _page_range_mask(page_range_str, total_pages):
+    """
+    将页码范围字符串解析为页面位图（结果会被缓存）
+    
+    Args:
+        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"（非空）
+        total_pages: PDF总页数
+        
+    Returns:
+        bytes: 长度为total_pages的位图，选中的页面（索引从0开始）对应的字节为1
+    """
+    # 用长度为total_pages的字节位图记录选择的页面，范围通过切片赋值一次性置位，
+    # 不会为每个页码创建Python整数对象
+    page_mask = bytearray(total_pages)
+    parts = page_range_str.replace(' ', '').split(',')
+    
+    for part in parts:
+        if not part:
+            continue
+        
+        if '-' in part:
+            # 处理范围，如 "3-5"
+            try:
+                start, end = part.split('-', 1)
+                start_page = int(start) - 1  # 转换为0-based索引
+                end_page = int(end) - 1
+                
+                # 确保范围有效
+                if start_page < 0:
+                    start_page = 0
+                if end_page >= total_pages:
+                    end_page = total_pages - 1
+                if start_page <= end_page:
+                    page_mask[start_page:end_page + 1] = b'\x01' * (end_page - start_page + 1)
+            except ValueError:
+                raise ValueError(f'无效的页码范围格式: {part}')
+        else:
+            # 处理单个页码，如 "1"
+            try:
+                page_num = int(part) - 1  # 转换为0-based索引
+                if 0 <= page_num < total_pages:
+                    page_mask[page_num] = 1
+            except ValueError:
+                raise ValueError(f'无效的页码: {part}')
+    
+    return bytes(page_mask)
+
+
+@lru_cache(maxsize=512)
+def parse_page_range(page_range_str, total_pages):
+    """
+    解析页码范围字符串，如 "1,2,3-5,7,10-20"（结果会被缓存）
+    
+    Args:
+        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"，空字符串表示全部页面
+        total_pages: PDF总页数
+        
+    Returns:
+        tuple: 页面索引（从0开始），已排序且去重
+    """
+    if not page_range_str or not page_range_str.strip():
+        # 如果没有指定页码范围，返回所有页面
+        return tuple(range(total_pages))
+    
+    # 按位图顺序取出被选中的索引，结果天然有序且去重
+    return tuple(compress(range(total_pages), _page_range_mask(page_range_str, total_pages)))
+
+
+def count_odd_even_pages(page_range_str, total_pages):
+    """
+    统计页码范围中原始文档的奇数页和偶数页数量（不生成页面索引列表）
+    
+    Args:
+        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"，None或空字符串表示全部页面
+        total_pages: PDF总页数
+        
+    Returns:
+        tuple: (奇数页数, 偶数页数)
+    """
+    if not page_range_str or not page_range_str.strip():
+        # 全部页面：直接计算
+        return (total_pages + 1) // 2, total_pages // 2
+    
+    # 位图中偶数下标是奇数页（第1页是索引0），切片后用bytes.count在C层计数
+    page_mask = _page_range_mask(page_range_str, total_pages)
+    return page_mask[0::2].count(1), page_mask[1::2].count(1)
+
+
+def select_pdf_pages(pdf_path, page_range_str=None):
+    """
+    读取PDF并按页码范围选出奇数页和偶数页的索引
+    
+    Args:
+        pdf_path: 原始PDF文件路径
+        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"，None或空字符串表示全部页面
+        
+    Returns:
+        tuple: (PdfReader对象, 总页数, 奇数页索引列表, 偶数页索引列表)，索引从0开始
+    """
+    # 一次性读入内存，避免pypdf解析xref/对象流时对文件进行大量小的read/seek
+    with open(pdf_path, 'rb') as f:
+        reader = PdfReader(io.BytesIO(f.read()))
+    total_pages = len(reader.pages)
+    
+    odd_indices, even_indices = split_page_indices(page_range_str, total_pages)
+    return reader, total_pages, odd_indices, even_indices
+
+
+def split_page_indices(page_range_str, total_pages):
+    """
+    按页码范围选出原始文档中的奇数页和偶数页索引
+    
+    Args:
+        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"，None或空字符串表示全部页面
+        total_pages: PDF总页数
+        
+    Returns:
+        tuple: (奇数页索引列表, 偶数页索引列表)，索引从0开始
+        
+    Raises:
+        ValueError: 页码范围格式错误或没有选择任何页面
+    """
+    # idx是0-based索引，所以第1页是idx=0（奇数），第2页是idx=1（偶数）
+    if not page_range_str or not page_range_str.strip():
+        # 全部页面（最常见的情况）：直接按步长生成，无需解析页码范围
+        odd_indices = list(range(0, total_pages, 2))  # 原始文档中的奇数页（1, 3, 5, ...）
+        even_indices = list(range(1, total_pages, 2))  # 原始文档中的偶数页（2, 4, 6, ...）
+    else:
+        # 解析页码范围
+        selected_indices = parse_page_range(page_range_str, total_pages)
+        
+        # 在选择的页面中，重新划分奇偶页（基于在原始文档中的位置）
+        # 注意：这里基于选择的页面在原始文档中的实际页码位置来判断奇偶
+        odd_indices = [idx for idx in selected_indices if not idx & 1]
+        even_indices = [idx for idx in selected_indices if idx & 1]
+    
+    if not odd_indices and not even_indices:
+        raise ValueError('没有选择任何页面')
     
-    odd_path = os.path.join(output_dir, 'odd_pages.pdf')
-    with open(odd_path, 'wb') as f:
-        odd_writer.write(f)
+    return odd_indices, even_indices
+
+
+def _write_pdf(writer, path):
+    """
+    将PdfWriter写入文件
     
-    return odd_path, even_path, total_pages, selected_count
+    Args:
+        writer: PdfWriter对象
+        path: 输出文件路径
+    """
+    with open(path, 'wb', buffering=PDF_WRITE_BUFFER_SIZE) as f:
+        writer.write(f)
+
+
+def _split_pdf_pages_pikepdf(pdf_path, output_dir, page_range_str=None):
+    """
+    使用pikepdf将PDF分为奇数页和偶数页两个文件（参数和返回值同split_pdf_pages）
+    """
+    with pikepdf.open(pdf_path) as src:
+        total_pages = len(src.pages)
+        odd_indices, even_indices = split_page_indices(page_range_str, total_pages)
+        # 没有该奇偶性的页面时不生成空PDF
+        even_path = os.path.join(output_dir, 'even_pages.pdf') if even_indices else None
+        odd_path = os.path.join(output_dir, 'odd_pages.pdf') if odd_indices else None
+        
+        # 偶数页从小到大，奇数页从大到小
+        # 两个文件依次保存：复制的页面内容在保存时才从原文件读取，不能在多个线程中同时读取
+        for indices, path in ((even_indices, even_path), (odd_indices[::-1], odd_path)):
+            if path is None:
+                continue
+            if len(indices) == total_pages and indices == list(range(total_pages)):
+                # 包含原文件的全部页面且顺序不变（如只有1页的文档），直接复制文件
+                shutil.copyfile(pdf_path, path)
+                continue
+            
+            dst = pikepdf.Pdf.new()
+            dst.pages.extend(src.pages[idx] for idx in indices)
+            dst.save(path, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    
+    selected_count = len(odd_indices) + len(even_indices)
+    return odd_path, even_path, total_pages, selected_count, len(odd_indices), len(even_indices)
+
+
+def split_pdf_pages(pdf_path, output_dir, page_range_str=None):
+    """
+    将PDF分为奇数页和偶数页两个文件
+    
+    Args:
+        pdf_path: 原始PDF文件路径
+        output_dir: 输出目录
+        page_range_str: 页码范围字符串，如 "1,2,3-5,7,10-20"，None或空字符串表示全部页面
+        
+    Returns:
+        tuple: (奇数页文件路径, 偶数页文件路径, 总页数, 选择的页数, 奇数页数, 偶数页数)，
+               没有选择奇数页（或偶数页）时对应的文件路径为None
+    """
+    if pikepdf is not None:
+        return _split_pdf_pages_pikepdf(pdf_path, output_dir, page_range_str)
+    
+    reader, total_pages, odd_indices, even_indices = select_pdf_pages(pdf_path, page_range_str)
+    selected_count = len(odd_indices) + len(even_indices)
+    
+    # 没有该奇偶性的页面时不生成空PDF
+    even_path = os.path.join(output_dir, 'even_pages.pdf') if even_indices else None
+    odd_path = os.path.join(output_dir, 'odd_pages.pdf') if odd_indices else None
+    
+    # 偶数页PDF从小到大，奇数页PDF从大到小
+    writes = []
+    for indices, path in ((even_indices, even_path), (odd_indices[::-1], odd_path)):
+        if path is None:
+            continue
+        if len(indices) == total_pages and indices == list(range(total_pages)):
+            # 包含原文件的全部页面且顺序不变（如只有1页的文档），直接复制文件
+            shutil.copyfile(pdf_path, path)
+            continue
+        # 使用append按页码列表一次性导入，而不是逐页add_page；不导入书签（页面不完整）
+        writer = PdfWriter()
+        writer.append(reader, pages=indices, import_outline=False)
+        writes.append((writer, path))
+    
+    if len(writes) == 2:
+        # 两个文件互不依赖，同时写入
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(_write_pdf, writer, path) for writer, path in writes]
+            for future in futures:
+                future.result()
+    else:
+        for writer, path in writes:
+            _write_pdf(writer, path)
+    
+    return odd_path, even_path, total_pages, selected_count, len(odd_indices), len(even_indices)
+
+
+def format_page_list(page_indices):
+    """
+    将页面索引列表转换为lp -P使用的页码列表字符串
+    
+    Args:
+        page_indices: 页面索引列表（从0开始）
+        
+    Returns:
+        str: 页码列表字符串，如 "1,3,5"
+    """
+    return ','.join(str(idx + 1) for idx in page_indices)
 
 
+@lru_cache(maxsize=1)
 def find_lp_command():
     """
-    查找lp命令的完整路径
+    查找lp命令的完整路径（结果会被缓存）
     
     Returns:
         str: lp命令的完整路径，如果找不到则返回None
@@ -442,59 +1342,114 @@ def find_lp_command():
     ]
     
     for path in possible_paths:
-        if os.path.exists(path) and os.access(path, os.X_OK):
+        if os.access(path, os.X_OK):
             return path
     
-    # 尝试使用which命令查找（使用shell环境）
-    try:
-        # 在macOS上，使用/bin/sh来确保PATH正确
-        result = subprocess.run(
-            ['/bin/sh', '-c', 'which lp'],
-            capture_output=True,
-            text=True,
-            timeout=5,
-            env=os.environ.copy()
-        )
-        if result.returncode == 0:
-            found_path = result.stdout.strip()
-            if found_path and os.path.exists(found_path):
-                return found_path
-    except:
-        pass
+    # 在PATH中查找（不启动shell进程）
+    return shutil.which('lp', path=_SUBPROCESS_ENV['PATH'])
+
+
+def _job_monitor_loop():
+    """
+    后台监控线程：定期刷新最近被查询过的打印机的打印队列快照，
+    所有打印机都空闲超过JOB_MONITOR_IDLE_TIMEOUT后线程退出
+    """
+    while True:
+        time.sleep(JOB_MONITOR_INTERVAL)
+        
+        now = time.monotonic()
+        with _JOB_MONITOR_LOCK:
+            for printer_name in list(_JOB_SNAPSHOTS):
+                if now - _JOB_SNAPSHOTS[printer_name]['last_access'] > JOB_MONITOR_IDLE_TIMEOUT:
+                    del _JOB_SNAPSHOTS[printer_name]
+            if not _JOB_SNAPSHOTS:
+                _JOB_MONITOR['thread'] = None
+                return
+            snapshots = list(_JOB_SNAPSHOTS.items())
+        
+        for printer_name, snapshot in snapshots:
+            result = _query_print_jobs(printer_name)
+            with _JOB_MONITOR_LOCK:
+                # 查询期间快照被清除或替换时丢弃这次（可能已过时的）结果
+                if _JOB_SNAPSHOTS.get(printer_name) is snapshot:
+                    snapshot['result'] = result
+
+
+def invalidate_print_jobs_snapshot():
+    """
+    清除所有打印队列快照和状态缓存，下次查询时会同步执行lpstat（提交新打印任务后调用）
+    """
+    with _JOB_MONITOR_LOCK:
+        _JOB_SNAPSHOTS.clear()
+    _STATUS_CACHE.clear()
+
+
+def get_print_jobs_snapshot(printer_name=None):
+    """
+    获取打印队列快照
     
-    return None
+    首次查询某个打印机时同步执行lpstat并启动后台监控线程，之后直接返回
+    监控线程定期刷新的结果，轮询请求不再每次都启动lpstat进程
+    
+    Args:
+        printer_name: 打印机名称，如果为None则查询全部打印机
+        
+    Returns:
+        dict: {'jobs': 任务列表} 或 {'error': 错误信息}
+    """
+    with _JOB_MONITOR_LOCK:
+        snapshot = _JOB_SNAPSHOTS.get(printer_name)
+        if snapshot:
+            snapshot['last_access'] = time.monotonic()
+            return snapshot['result']
+    
+    result = _query_print_jobs(printer_name)
+    
+    with _JOB_MONITOR_LOCK:
+        _JOB_SNAPSHOTS[printer_name] = {'result': result, 'last_access': time.monotonic()}
+        if _JOB_MONITOR['thread'] is None:
+            thread = threading.Thread(target=_job_monitor_loop, name='print-job-monitor', daemon=True)
+            _JOB_MONITOR['thread'] = thread
+            thread.start()
+    
+    return result
 
 
-def get_print_job_status(printer_name=None, session_id=None):
+def _is_job_id(token):
     """
-    获取打印任务状态
+    判断字符串是否是打印任务ID（格式：打印机名-数字）
     
     Args:
-        printer_name: 打印机名称，如果为None则查询默认打印机
-        session_id: 会话ID，用于获取打印页数信息
+        token: 待检查的字符串
         
     Returns:
-        dict: 包含打印任务状态的字典
+        bool: 是否是任务ID
+    """
+    _, sep, number = token.rpartition('-')
+    return bool(sep) and number.isdigit()
+
+
+def _query_print_jobs(printer_name=None):
+    """
+    查询打印队列并解析出任务列表（优先使用pycups，否则使用lpstat）
+    
+    Args:
+        printer_name: 打印机名称，如果为None则查询全部打印机
+        
+    Returns:
+        dict: {'jobs': 任务列表} 或 {'error': 错误信息}
     """
+    conn = get_cups_connection()
+    if conn is not None:
+        try:
+            return {'jobs': _query_print_jobs_with_cups(conn, printer_name)}
+        except Exception:
+            reset_cups_connection()
+    
     lpstat_command = find_lpstat_command()
     if not lpstat_command:
         return {'error': '找不到lpstat命令'}
     
-    env = os.environ.copy()
-    if '/usr/bin' not in env.get('PATH', ''):
-        env['PATH'] = '/usr/bin:/usr/local/bin:/bin:/usr/sbin:/sbin:' + env.get('PATH', '')
-    
-    # 获取会话信息以了解打印页数
-    session_info = None
-    if session_id:
-        session_file = os.path.join(TEMP_FOLDER, session_id, 'session.json')
-        if os.path.exists(session_file):
-            try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session_info = json.load(f)
-            except:
-                pass
-    
     try:
         # 查询打印队列（使用-l获取详细信息）
         if printer_name:
@@ -502,7 +1457,7 @@ def get_print_job_status(printer_name=None, session_id=None):
                 [lpstat_command, '-l', '-o', printer_name],
                 capture_output=True,
                 text=True,
-                env=env,
+                env=_SUBPROCESS_ENV,
                 timeout=5
             )
         else:
@@ -510,120 +1465,451 @@ def get_print_job_status(printer_name=None, session_id=None):
                 [lpstat_command, '-l', '-o'],
                 capture_output=True,
                 text=True,
-                env=env,
+                env=_SUBPROCESS_ENV,
                 timeout=5
             )
         
         jobs = []
         current_job = None
-        current_job_info = []
-        
-        # 安全地处理输出
-        output_lines = []
-        try:
-            if result.stdout:
-                output_lines = result.stdout.splitlines()
-        except (AttributeError, TypeError):
-            output_lines = []
         
-        for line in output_lines:
-            try:
-                line = line.strip() if line else ''
-                if not line:
-                    if current_job:
-                        jobs.append(current_job)
-                        current_job = None
-                        current_job_info = []
-                    continue
-            except Exception:
+        for line in (result.stdout or '').splitlines():
+            line = line.strip()
+            if not line:
+                if current_job:
+                    jobs.append(current_job)
+                    current_job = None
                 continue
             
             # 检查是否是新的任务行
             # 格式可能是: "打印机 Brother_DCP_T425W 正在打印 Brother_DCP_T425W-14..."
             # 或者: "Brother_DCP_T425W-14  user  pages  date"
-            try:
-                parts = line.split() if line else []
-                
-                # 检查是否包含任务ID格式（如 "Brother_DCP_T425W-14"）
-                is_new_job = False
-                job_id = None
-                status = 'queued'
-                
-                # 方法1: 检查是否包含 "正在打印" 或 "printing" 关键词，且包含任务ID格式
-                if len(parts) >= 2:
-                    line_lower = line.lower() if line else ''
-                    if '正在打印' in line or 'printing' in line_lower:
-                        # 查找任务ID（格式：打印机名-数字）
-                        for part in parts:
-                            if part and '-' in part:
-                                try:
-                                    last_part = part.split('-')[-1]
-                                    if last_part.isdigit():
-                                        job_id = part
-                                        is_new_job = True
-                                        status = 'printing'
-                                        break
-                                except (IndexError, AttributeError):
-                                    continue
-                
-                # 方法2: 检查是否是标准的任务行格式（任务ID在开头）
-                if not is_new_job and len(parts) >= 2:
-                    try:
-                        potential_job_id = parts[0]
-                        if potential_job_id and '-' in potential_job_id:
-                            last_part = potential_job_id.split('-')[-1]
-                            if last_part.isdigit():
-                                job_id = potential_job_id
-                                is_new_job = True
-                                # 检查状态关键词
-                                line_lower = line.lower() if line else ''
-                                if 'printing' in line_lower or '正在打印' in line:
-                                    status = 'printing'
-                                elif 'completed' in line_lower or '已完成' in line_lower:
-                                    status = 'completed'
-                                elif 'held' in line_lower or '已暂停' in line_lower:
-                                    status = 'held'
-                                elif 'cancelled' in line_lower or '已取消' in line_lower:
-                                    status = 'cancelled'
-                    except (IndexError, AttributeError):
-                        pass
-                
-                if is_new_job and job_id:
-                    # 这是一个新的任务行
-                    if current_job:
-                        jobs.append(current_job)
-                    
-                    current_job = {
-                        'job_id': job_id,
-                        'status': status,
-                        'info': line,
-                        'details': []
-                    }
-                    current_job_info = [line]
-                elif current_job:
-                    # 这是当前任务的详细信息（可能是缩进的行，如 "Processing page 4..."）
-                    if 'details' not in current_job:
-                        current_job['details'] = []
-                    if isinstance(current_job['details'], list):
-                        current_job['details'].append(line)
-                    current_job_info.append(line)
-            except Exception as e:
-                # 如果解析单行时出错，记录但继续处理
-                import logging
-                logging.warning(f'解析打印队列行时出错: {str(e)}, 行内容: {line[:50]}')
-                # 如果当前有任务，将这一行作为详细信息添加
+            # 每行只分词和转小写一次
+            tokens = line.split()
+            lc = line.casefold()
+            job_id = None
+            status = 'queued'
+            
+            if len(tokens) >= 2:
+                if 'printing' in lc or '正在打印' in line:
+                    # 正在打印的任务：任务ID（格式：打印机名-数字）可能在行中任意位置
+                    status = 'printing'
+                    job_id = next((token for token in tokens if _is_job_id(token)), None)
+                elif _is_job_id(tokens[0]):
+                    # 标准的任务行格式（任务ID在开头），检查状态关键词
+                    job_id = tokens[0]
+                    if 'completed' in lc or '已完成' in line:
+                        status = 'completed'
+                    elif 'held' in lc or '已暂停' in line:
+                        status = 'held'
+                    elif 'cancelled' in lc or '已取消' in line:
+                        status = 'cancelled'
+            
+            if job_id:
+                # 这是一个新的任务行
                 if current_job:
-                    if 'details' not in current_job:
-                        current_job['details'] = []
-                    if isinstance(current_job['details'], list):
-                        current_job['details'].append(line)
-                continue
+                    jobs.append(current_job)
+                
+                current_job = {
+                    'job_id': job_id,
+                    'status': status,
+                    'info': line,
+                    'details': []
+                }
+            elif current_job:
+                # 这是当前任务的详细信息（可能是缩进的行，如 "Processing page 4..."）
+                current_job['details'].append(line)
         
         if current_job:
             jobs.append(current_job)
         
+        return {'jobs': jobs}
+    except subprocess.TimeoutExpired:
+        return {'error': '查询超时'}
+    except Exception as e:
+        return {'error': f'查询失败: {str(e)}'}
+
+
+def _query_print_jobs_with_cups(conn, printer_name=None):
+    """
+    通过pycups查询未完成的打印任务，返回与lpstat解析结果相同格式的任务列表
+    
+    Args:
+        conn: cups.Connection对象
+        printer_name: 打印机名称，如果为None则查询全部打印机
+        
+    Returns:
+        list: 任务列表
+    """
+    cups = _import_optional('cups')  # 调用前已通过get_cups_connection()确认可以导入
+    
+    job_states = {
+        cups.IPP_JOB_PENDING: 'queued',
+        cups.IPP_JOB_HELD: 'held',
+        cups.IPP_JOB_PROCESSING: 'printing',
+        cups.IPP_JOB_STOPPED: 'held',
+        cups.IPP_JOB_CANCELED: 'cancelled',
+        cups.IPP_JOB_ABORTED: 'cancelled',
+        cups.IPP_JOB_COMPLETED: 'completed',
+    }
+    
+    cups_jobs = conn.getJobs(
+        which_jobs='not-completed',
+        requested_attributes=[
+            'job-id', 'job-state', 'job-printer-uri', 'job-name',
+            'job-originating-user-name', 'job-k-octets',
+            'job-impressions-completed', 'job-printer-state-message',
+        ]
+    )
+    
+    jobs = []
+    for job_number in sorted(cups_jobs):
+        attrs = cups_jobs[job_number]
+        job_printer = attrs.get('job-printer-uri', '').rsplit('/', 1)[-1]
+        if printer_name and job_printer != printer_name:
+            continue
+        
+        # 与lpstat一致的任务ID格式："打印机名-任务号"
+        job_id = f'{job_printer}-{job_number}'
+        state = attrs.get('job-state')
+        job = {
+            'job_id': job_id,
+            'status': job_states.get(state, 'queued'),
+            'info': f"{job_id}  {attrs.get('job-originating-user-name', '')}  "
+                    f"{attrs.get('job-k-octets', 0) * 1024}  {attrs.get('job-name', '')}",
+            'details': []
+        }
+        message = attrs.get('job-printer-state-message')
+        if message:
+            job['details'].append(message)
+        
+        # 正在打印的页 = 已完成的页数 + 1
+        impressions = attrs.get('job-impressions-completed')
+        if state == cups.IPP_JOB_PROCESSING and isinstance(impressions, int):
+            job['current_page'] = impressions + 1
+        
+        jobs.append(job)
+    
+    return jobs
+
+
+def _write_session_file(session_file, session_info):
+    """
+    将会话信息写入session.json（在后台写入线程或程序退出时执行）
+    
+    Args:
+        session_file: session.json路径
+        session_info: 会话信息
+    """
+    try:
+        # 先序列化成完整的字节串，再一次性写入（json.dump会分成大量小的write调用）
+        if orjson is not None:
+            data = orjson.dumps(session_info)
+        else:
+            data = json.dumps(session_info, ensure_ascii=False).encode('utf-8')
+        with open(session_file, 'wb', buffering=SESSION_WRITE_BUFFER_SIZE) as f:
+            f.write(data)
+    except OSError:
+        # 会话目录已被清理
+        pass
+
+
+@lru_cache(maxsize=256)
+def _session_path(session_id):
+    """
+    获取会话的session.json路径（结果会被缓存）
+    
+    Args:
+        session_id: 会话ID
+        
+    Returns:
+        Path: session.json路径
+    """
+    return TEMP_FOLDER_PATH / session_id / 'session.json'
+
+
+def _load_session(session_id):
+    """
+    获取会话信息（优先从内存读取，未命中时读取session.json）
+    
+    Args:
+        session_id: 会话ID
+        
+    Returns:
+        dict: 会话信息，会话不存在或读取失败时返回None
+    """
+    with _SESSIONS_LOCK:
+        session_info = SESSIONS.get(session_id)
+        if session_info is None:
+            try:
+                with open(_session_path(session_id), 'rb') as f:
+                    data = f.read()
+                session_info = orjson.loads(data) if orjson is not None else json.loads(data)
+            except (OSError, ValueError):
+                return None
+            SESSIONS[session_id] = session_info
+        _SESSION_ACCESS[session_id] = time.monotonic()
+        return session_info
+
+
+def _save_session(session_id, session_info):
+    """
+    保存会话信息：立即更新内存缓存并标记为已修改，session.json由后台线程写入
+    
+    Args:
+        session_id: 会话ID
+        session_info: 会话信息
+    """
+    with _SESSIONS_LOCK:
+        SESSIONS[session_id] = session_info
+        _SESSION_ACCESS[session_id] = time.monotonic()
+        _DIRTY_SESSIONS.add(session_id)
+        _ensure_session_flusher()
+
+
+def _ensure_session_flusher():
+    """
+    启动后台写入线程（已启动时不做任何事）
+    """
+    with _SESSIONS_LOCK:
+        if _SESSION_FLUSHER['thread'] is None:
+            thread = threading.Thread(target=_session_flush_loop, name='session-flusher', daemon=True)
+            _SESSION_FLUSHER['thread'] = thread
+            thread.start()
+
+
+def flush_sessions():
+    """
+    将所有已修改的会话信息写入session.json（程序退出时也会调用，保证不丢失修改）
+    """
+    with _SESSION_FLUSH_LOCK:
+        with _SESSIONS_LOCK:
+            # 复制会话信息，避免写入过程中被其他请求修改
+            dirty = [
+                (session_id, dict(SESSIONS[session_id]))
+                for session_id in _DIRTY_SESSIONS if session_id in SESSIONS
+            ]
+            _DIRTY_SESSIONS.clear()
+        
+        # 同一会话在一个间隔内的多次修改只写入一次
+        for session_id, session_info in dirty:
+            _write_session_file(_session_path(session_id), session_info)
+
+
+atexit.register(flush_sessions)
+
+
+def _session_flush_loop():
+    """
+    后台写入线程：每隔SESSION_FLUSH_INTERVAL秒写入一次已修改的会话，并移除长时间未访问的会话和已完成的上传任务记录
+    """
+    while True:
+        time.sleep(SESSION_FLUSH_INTERVAL)
+        flush_sessions()
+        _evict_idle_sessions()
+
+
+def _evict_idle_sessions():
+    """
+    从内存中移除超过SESSION_IDLE_TTL秒未访问的会话（未写入的修改保留到写入后再移除），
+    以及完成超过SESSION_IDLE_TTL秒的异步上传任务记录
+    """
+    expire_before = time.monotonic() - SESSION_IDLE_TTL
+    with _SESSIONS_LOCK:
+        idle = [
+            session_id for session_id, accessed in _SESSION_ACCESS.items()
+            if accessed < expire_before and session_id not in _DIRTY_SESSIONS
+        ]
+        for session_id in idle:
+            SESSIONS.pop(session_id, None)
+            _SESSION_ACCESS.pop(session_id, None)
+            _SESSION_FILE_CHECKS.pop(session_id, None)
+        
+        finished = [
+            session_id for session_id, job in _UPLOAD_JOBS.items()
+            if job.get('finished', expire_before) < expire_before
+        ]
+        for session_id in finished:
+            del _UPLOAD_JOBS[session_id]
+
+
+def _session_files_exist(session_id, session_info):
+    """
+    检查会话的奇偶页PDF文件是否存在（结果缓存SESSION_FILE_CHECK_TTL秒）
+    
+    Args:
+        session_id: 会话ID
+        session_info: 会话信息
+        
+    Returns:
+        tuple: (奇数页文件是否存在, 偶数页文件是否存在)
+    """
+    checked = _SESSION_FILE_CHECKS.get(session_id)
+    now = time.monotonic()
+    if checked and now - checked[0] < SESSION_FILE_CHECK_TTL:
+        return checked[1], checked[2]
+    
+    # 使用lp -P打印时没有拆分文件，检查原始PDF；没有该奇偶性的页面时文件路径为None
+    if session_info.get('odd_page_list') is not None:
+        odd_exists = even_exists = os.path.exists(session_info.get('pdf_path') or '')
+    else:
+        odd_exists = bool(session_info.get('odd_path')) and os.path.exists(session_info['odd_path'])
+        even_exists = bool(session_info.get('even_path')) and os.path.exists(session_info['even_path'])
+    _SESSION_FILE_CHECKS[session_id] = (now, odd_exists, even_exists)
+    return odd_exists, even_exists
+
+
+def _drop_session(session_id):
+    """
+    从内存缓存中移除会话
+    
+    Args:
+        session_id: 会话ID
+    """
+    with _SESSIONS_LOCK:
+        SESSIONS.pop(session_id, None)
+        _SESSION_ACCESS.pop(session_id, None)
+        _DIRTY_SESSIONS.discard(session_id)
+        _UPLOAD_JOBS.pop(session_id, None)
+        _SESSION_FILE_CHECKS.pop(session_id, None)
+
+
+def _upload_cache_dir(file_hash, file_ext, page_range):
+    """
+    获取上传缓存的目录路径
+    
+    Args:
+        file_hash: 上传文件的哈希
+        file_ext: 文件扩展名
+        page_range: 页码范围字符串
+        
+    Returns:
+        str: 缓存目录路径（由文件哈希、扩展名、页码范围和打印方式共同决定）
+    """
+    key = f'{file_hash}\0{file_ext}\0{page_range.replace(" ", "")}\0{LP_PAGE_RANGES}'
+    return os.path.join(CACHE_FOLDER, hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest())
+
+
+def _link_or_copy(src, dst):
+    """
+    创建硬链接（不复制文件内容），不支持硬链接时复制文件
+    
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _cached_file_names(meta):
+    """
+    获取缓存中保存的文件名列表
+    
+    Args:
+        meta: 缓存的元数据
+        
+    Returns:
+        list: 文件名列表
+    """
+    return [name for name in (meta['pdf_name'], meta['odd_name'], meta['even_name']) if name]
+
+
+def _load_cached_upload(cache_dir, temp_dir):
+    """
+    读取上传缓存，并把缓存的文件链接到会话目录
+    
+    Args:
+        cache_dir: 缓存目录
+        temp_dir: 会话临时目录
+        
+    Returns:
+        dict: 缓存的元数据，缓存不存在、已过期或读取失败时返回None
+    """
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    try:
+        if time.time() - os.path.getmtime(meta_path) > UPLOAD_CACHE_TTL:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            return None
+        with open(meta_path, 'rb') as f:
+            data = f.read()
+        meta = orjson.loads(data) if orjson is not None else json.loads(data)
+        for name in _cached_file_names(meta):
+            _link_or_copy(os.path.join(cache_dir, name), os.path.join(temp_dir, name))
+    except (OSError, ValueError, KeyError):
+        return None
+    return meta
+
+
+def _store_cached_upload(cache_dir, temp_dir, meta):
+    """
+    把会话目录中的转换和拆分结果保存到上传缓存，并删除过期的缓存
+    
+    Args:
+        cache_dir: 缓存目录
+        temp_dir: 会话临时目录
+        meta: 缓存的元数据
+    """
+    staging_dir = None
+    try:
+        # 先写入临时目录再重命名，同时上传相同文件时只保留先完成的一份
+        staging_dir = tempfile.mkdtemp(prefix='.part', dir=CACHE_FOLDER)
+        for name in _cached_file_names(meta):
+            _link_or_copy(os.path.join(temp_dir, name), os.path.join(staging_dir, name))
+        _write_session_file(Path(staging_dir) / 'meta.json', meta)
+        os.rename(staging_dir, cache_dir)
+        staging_dir = None
+    except OSError:
+        pass
+    finally:
+        if staging_dir is not None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    _sweep_upload_cache()
+
+
+def _sweep_upload_cache():
+    """
+    在后台删除超过UPLOAD_CACHE_TTL秒的上传缓存（启动时和每次保存缓存后调用）
+    """
+    expire_before = time.time() - UPLOAD_CACHE_TTL
+    try:
+        with os.scandir(CACHE_FOLDER) as entries:
+            for entry in entries:
+                if entry.stat(follow_symlinks=False).st_mtime < expire_before:
+                    _CLEANUP_WORKER.submit(shutil.rmtree, entry.path, ignore_errors=True)
+    except OSError:
+        pass
+
+
+if UPLOAD_CACHE:
+    _sweep_upload_cache()
+
+
+def get_print_job_status(printer_name=None, session_id=None):
+    """
+    获取打印任务状态
+    
+    Args:
+        printer_name: 打印机名称，如果为None则查询默认打印机
+        session_id: 会话ID，用于获取打印页数信息
+        
+    Returns:
+        dict: 包含打印任务状态的字典
+    """
+    snapshot = get_print_jobs_snapshot(printer_name)
+    if 'error' in snapshot:
+        return {'error': snapshot['error']}
+    
+    # 复制任务字典，避免修改监控线程共享的快照
+    jobs = [dict(job) for job in snapshot['jobs']]
+    
+    # 获取会话信息以了解打印页数
+    session_info = _load_session(session_id) if session_id else None
+    
+    try:
         # 尝试从详细信息中提取页面信息
-        import re
         for job in jobs:
             try:
                 if job.get('status') == 'printing' and session_info:
@@ -635,10 +1921,10 @@ def get_print_job_status(printer_name=None, session_id=None):
                     job_id = job.get('job_id', '')
                     if job_id and session_info.get('odd_job_id') == job_id:
                         is_odd = True
-                        total_pages = session_info.get('odd_pages', 0) or 0
+                        total_pages = session_info.get('odd_count', 0) or 0
                     elif job_id and session_info.get('even_job_id') == job_id:
                         is_even = True
-                        total_pages = session_info.get('even_pages', 0) or 0
+                        total_pages = session_info.get('even_count', 0) or 0
                     
                     # 尝试从详细信息中解析页面信息
                     # 查找 "Processing page X..." 格式
@@ -653,13 +1939,13 @@ def get_print_job_status(printer_name=None, session_id=None):
                             try:
                                 detail_lower = detail_line.lower()
                                 # 匹配 "Processing page 4..." 或 "正在处理第 4 页..."
-                                page_match = re.search(r'processing\s+page\s+(\d+)', detail_lower, re.IGNORECASE)
+                                page_match = _RE_PROC_PAGE.search(detail_lower)
                                 if not page_match:
                                     # 匹配中文格式 "正在处理第 X 页"
-                                    page_match = re.search(r'正在处理.*?第\s*(\d+)\s*页', detail_lower)
+                                    page_match = _RE_PROC_CN.search(detail_lower)
                                 if not page_match:
                                     # 匹配 "page X of Y" 格式
-                                    page_match = re.search(r'page\s+(\d+)\s+of\s+(\d+)', detail_lower, re.IGNORECASE)
+                                    page_match = _RE_PAGE_OF.search(detail_lower)
                                     if page_match:
                                         try:
                                             current_page = int(page_match.group(1))
@@ -712,13 +1998,104 @@ def get_print_job_status(printer_name=None, session_id=None):
             'job_count': len(jobs),
             'has_jobs': len(jobs) > 0
         }
-    except subprocess.TimeoutExpired:
-        return {'error': '查询超时'}
     except Exception as e:
         return {'error': f'查询失败: {str(e)}'}
 
 
-def print_pdf(pdf_path, printer_name=None, print_quality='Normal', output_order='normal'):
+def get_print_job_status_cached(printer_name=None, session_id=None):
+    """
+    获取打印任务状态（短时间内的重复查询直接返回缓存结果，并发查询合并为一次）
+    
+    Args:
+        printer_name: 打印机名称，如果为None则查询默认打印机
+        session_id: 会话ID，用于获取打印页数信息
+        
+    Returns:
+        dict: 包含打印任务状态的字典
+    """
+    key = (printer_name, session_id)
+    cached = _STATUS_CACHE.get(key)
+    if cached and time.monotonic() - cached[0] < STATUS_CACHE_TTL:
+        return cached[1]
+    
+    with _STATUS_LOCKS_LOCK:
+        lock = _STATUS_LOCKS.setdefault(key, threading.Lock())
+    
+    with lock:
+        # 等待锁期间可能已有其他请求完成了查询
+        cached = _STATUS_CACHE.get(key)
+        if cached and time.monotonic() - cached[0] < STATUS_CACHE_TTL:
+            return cached[1]
+        
+        status = get_print_job_status(printer_name, session_id)
+        now = time.monotonic()
+        _STATUS_CACHE[key] = (now, status)
+    
+    # 清理过期的缓存项，避免会话增多后缓存无限增长
+    if len(_STATUS_CACHE) > 64:
+        with _STATUS_LOCKS_LOCK:
+            for old_key, (ts, _) in list(_STATUS_CACHE.items()):
+                if now - ts >= STATUS_CACHE_TTL:
+                    _STATUS_CACHE.pop(old_key, None)
+                    _STATUS_LOCKS.pop(old_key, None)
+    
+    return status
+
+
+def _print_pdf_with_cups(conn, pdf_path, printer_name, print_quality, output_order, page_list):
+    """
+    通过pycups提交打印任务
+    
+    Args:
+        conn: cups.Connection对象
+        pdf_path: PDF文件路径
+        printer_name: 打印机名称，如果为None则使用默认打印机
+        print_quality: 打印质量
+        output_order: 打印顺序
+        page_list: 要打印的页码列表字符串，None表示打印全部页面
+        
+    Returns:
+        tuple: (是否成功, 错误信息, 打印任务ID)，CUPS连接失效时返回None（改用lp命令）
+    """
+    cups = _import_optional('cups')  # 调用前已通过get_cups_connection()确认可以导入
+    
+    try:
+        if not printer_name:
+            printer_name = conn.getDefault()
+            if not printer_name:
+                return False, '没有默认打印机，请选择打印机', None
+        
+        options = {
+            'cupsPrintQuality': print_quality,
+            'outputorder': output_order,
+        }
+        if page_list is not None:
+            options['page-ranges'] = page_list
+        
+        job_number = conn.printFile(
+            printer_name, os.path.abspath(pdf_path), os.path.basename(pdf_path), options
+        )
+    except cups.IPPError as e:
+        status, message = e.args
+        if status == cups.IPP_NOT_FOUND:
+            return False, f'找不到打印机: {printer_name}', None
+        elif status in (cups.IPP_FORBIDDEN, cups.IPP_NOT_AUTHORIZED):
+            return False, '打印权限被拒绝，请检查系统权限设置', None
+        else:
+            return False, f'打印失败: {message}', None
+    except RuntimeError:
+        # 连接已断开（如cupsd重启），改用lp命令
+        reset_cups_connection()
+        return None
+    
+    # 队列已变化，避免状态查询返回提交前的快照
+    invalidate_print_jobs_snapshot()
+    
+    # 与lpstat一致的任务ID格式："打印机名-任务号"
+    return True, None, f'{printer_name}-{job_number}'
+
+
+def print_pdf(pdf_path, printer_name=None, print_quality='Normal', output_order='normal', page_list=None):
     """
     打印PDF文件
     
@@ -727,10 +2104,15 @@ def print_pdf(pdf_path, printer_name=None, print_quality='Normal', output_order=
         printer_name: 打印机名称，如果为None则使用默认打印机
         print_quality: 打印质量，可选值：'High'（精细）、'Normal'（普通）、'Draft'（快速），默认为'Normal'
         output_order: 打印顺序，可选值：'normal'（按文件顺序打印）、'reverse'（逆序打印），默认为'normal'
+        page_list: 要打印的页码列表字符串（如 "1,3,5"，通过lp -P传递），None表示打印全部页面
         
     Returns:
         tuple: (是否成功, 错误信息, 打印任务ID)
     """
+    # 指定了空的页码列表时没有需要打印的页面（lp -P ""会打印全部页面）
+    if page_list is not None and not page_list:
+        return False, '没有需要打印的页面', None
+    
     # 检查文件是否存在
     if not os.path.exists(pdf_path):
         return False, f'文件不存在: {pdf_path}', None
@@ -739,6 +2121,23 @@ def print_pdf(pdf_path, printer_name=None, print_quality='Normal', output_order=
     if not os.access(pdf_path, os.R_OK):
         return False, f'文件不可读: {pdf_path}', None
     
+    # 验证打印质量参数
+    valid_qualities = ['High', 'Normal', 'Draft']
+    if print_quality not in valid_qualities:
+        print_quality = 'Normal'  # 默认使用普通质量
+    
+    # 验证打印顺序参数（仅适用于支持的打印系统，如CUPS）
+    valid_orders = ['normal', 'reverse']
+    if output_order not in valid_orders:
+        output_order = 'normal'
+    
+    # 优先通过pycups直接提交打印任务
+    conn = get_cups_connection()
+    if conn is not None:
+        result = _print_pdf_with_cups(conn, pdf_path, printer_name, print_quality, output_order, page_list)
+        if result is not None:
+            return result
+    
     # 查找lp命令
     lp_command = find_lp_command()
     if not lp_command:
@@ -748,11 +2147,6 @@ def print_pdf(pdf_path, printer_name=None, print_quality='Normal', output_order=
         else:
             return False, '找不到打印命令(lp)，请确保系统已安装CUPS打印服务。尝试的路径: /usr/bin/lp', None
     
-    # 在macOS上，确保PATH包含/usr/bin
-    env = os.environ.copy()
-    if '/usr/bin' not in env.get('PATH', ''):
-        env['PATH'] = '/usr/bin:/usr/local/bin:/bin:/usr/sbin:/sbin:' + env.get('PATH', '')
-    
     # 验证命令是否真的存在
     if not os.path.exists(lp_command):
         return False, f'打印命令不存在: {lp_command}', None
@@ -760,68 +2154,46 @@ def print_pdf(pdf_path, printer_name=None, print_quality='Normal', output_order=
     if not os.access(lp_command, os.X_OK):
         return False, f'打印命令不可执行: {lp_command}', None
     
-    # 验证打印质量参数
-    valid_qualities = ['High', 'Normal', 'Draft']
-    if print_quality not in valid_qualities:
-        print_quality = 'Normal'  # 默认使用普通质量
-    
-    # 验证打印顺序参数（仅适用于支持的打印系统，如CUPS）
-    valid_orders = ['normal', 'reverse']
-    if output_order not in valid_orders:
-        output_order = 'normal'
+    # 直接传递参数列表（不经过shell），避免额外的/bin/sh进程和引号注入问题
+    argv = [lp_command]
+    if printer_name:
+        # 使用指定打印机
+        argv += ['-d', printer_name]
+    argv += [
+        '-o', f'cupsPrintQuality={print_quality}',
+        '-o', f'outputorder={output_order}',
+    ]
+    if page_list is not None:
+        argv += ['-P', page_list]
+    argv.append(pdf_path)
     
     try:
-        if printer_name:
-            # 使用指定打印机
-            # 在macOS上，尝试使用shell执行以确保环境正确
-            cmd = (
-                f'{lp_command} -d "{printer_name}" '
-                f'-o cupsPrintQuality={print_quality} '
-                f'-o outputorder={output_order} '
-                f'"{pdf_path}"'
-            )
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                env=env
-            )
-        else:
+        if not printer_name:
             # 检查是否有默认打印机
             default_printer = get_default_printer()
             if not default_printer:
                 return False, '没有默认打印机，请选择打印机', None
-            
-            # 使用默认打印机
-            # 在macOS上，尝试使用shell执行以确保环境正确
-            cmd = (
-                f'{lp_command} '
-                f'-o cupsPrintQuality={print_quality} '
-                f'-o outputorder={output_order} '
-                f'"{pdf_path}"'
-            )
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                env=env
-            )
+        
+        result = subprocess.run(
+            argv,
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=30,
+            env=_SUBPROCESS_ENV
+        )
         
         # 尝试从输出中提取任务ID
         job_id = None
         if result.stdout:
             # lp命令输出格式: "request id is printer-name-123 (1 file(s))"
-            import re
-            match = re.search(r'request id is\s+(\S+)', result.stdout, re.IGNORECASE)
+            match = _RE_REQID.search(result.stdout)
             if match:
                 job_id = match.group(1)
         
+        # 队列已变化，避免状态查询返回提交前的快照
+        invalidate_print_jobs_snapshot()
+        
         return True, None, job_id
     except subprocess.CalledProcessError as e:
         # 获取详细错误信息
@@ -860,11 +2232,14 @@ def index():
 @app.route('/api/printers', methods=['GET'])
 def get_printers():
     """
-    获取可用打印机列表和默认打印机信息
+    获取可用打印机列表和默认打印机信息（查询参数 refresh=1 时先清除缓存）
     
     Returns:
         json: 打印机列表和默认打印机信息
     """
+    if request.args.get('refresh') == '1':
+        invalidate_printer_cache()
+    
     printers = get_available_printers()
     default_printer = get_default_printer()
     
@@ -875,157 +2250,286 @@ def get_printers():
     })
 
 
+@app.route('/api/printers/refresh', methods=['POST'])
+def refresh_printers():
+    """
+    清除打印机缓存并重新获取打印机列表
+    
+    Returns:
+        json: 打印机列表和默认打印机信息
+    """
+    invalidate_printer_cache()
+    return get_printers()
+
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """
     上传PDF或Word文件并分离页面
+    加 ?async=1 时保存文件后立即返回会话ID，由后台线程处理，通过 /api/upload/status/<session_id> 查询结果
     
     Returns:
         json: 上传结果和文件信息
     """
-    if 'file' not in request.files:
+    # 保存上传的文件（同时获取页码范围参数）
+    try:
+        filename, upload_path, page_range, file_hash = save_uploaded_file(UPLOAD_FOLDER)
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'文件过大，最大支持 {MAX_UPLOAD_SIZE // (1024 * 1024)}MB'}), 413
+    
+    if filename is None:
         return jsonify({'error': '没有文件'}), 400
     
-    file = request.files['file']
-    if file.filename == '':
+    if filename == '':
         return jsonify({'error': '未选择文件'}), 400
     
-    if not allowed_file(file.filename):
+    if not allowed_file(filename):
         return jsonify({'error': '只支持PDF和Word文档（.pdf, .doc, .docx）'}), 400
     
-    # 获取页码范围参数
-    page_range = request.form.get('page_range', '').strip()
-    
-    # 保存上传的文件
-    filename = file.filename
-    upload_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(upload_path)
-    
     # 创建临时目录用于存储分离的PDF
     temp_dir = tempfile.mkdtemp(dir=TEMP_FOLDER)
     
+    if request.args.get('async') == '1':
+        session_id = os.path.basename(temp_dir)
+        _UPLOAD_JOBS[session_id] = {'status': 'processing'}
+        _UPLOAD_WORKER.submit(_run_upload_job, session_id, filename, upload_path, temp_dir, page_range, file_hash)
+        return jsonify({'success': True, 'session_id': session_id, 'status': 'processing'}), 202
+    
+    result, code = _process_upload(filename, upload_path, temp_dir, page_range, file_hash)
+    return jsonify(result), code
+
+
+def _run_upload_job(session_id, filename, upload_path, temp_dir, page_range, file_hash):
+    """
+    后台处理异步上传的文件，并记录处理结果
+    
+    Args:
+        session_id: 会话ID
+        filename: 原始文件名
+        upload_path: 上传文件的保存路径
+        temp_dir: 会话临时目录
+        page_range: 页码范围字符串
+        file_hash: 上传文件的哈希
+    """
+    result, code = _process_upload(filename, upload_path, temp_dir, page_range, file_hash, async_job=True)
+    with _SESSIONS_LOCK:
+        # 处理期间会话已被清理时不再记录结果
+        if session_id in _UPLOAD_JOBS:
+            _UPLOAD_JOBS[session_id] = {
+                'status': 'done' if code == 200 else 'error',
+                'result': result,
+                'code': code,
+                'finished': time.monotonic(),  # 完成SESSION_IDLE_TTL秒后由后台线程移除
+            }
+    _ensure_session_flusher()
+
+
+def _process_upload(filename, upload_path, temp_dir, page_range, file_hash=None, async_job=False):
+    """
+    处理上传的文件：Word文档转换为PDF，拆分奇偶页并保存会话信息
+    相同的文件以相同的页码范围上传过时，直接使用缓存的结果
+    
+    Args:
+        filename: 原始文件名
+        upload_path: 上传文件的保存路径
+        temp_dir: 会话临时目录
+        page_range: 页码范围字符串
+        file_hash: 上传文件的哈希，None表示不使用缓存
+        async_job: 是否为异步上传任务（处理期间会话被清理时不保存会话，并删除生成的文件）
+        
+    Returns:
+        tuple: (响应内容, HTTP状态码)
+    """
     try:
         # 检查文件类型，如果是Word文档则先转换为PDF
         file_ext = filename.rsplit('.', 1)[1].lower()
-        pdf_path = upload_path
+        cache_dir = None
+        cached = None
+        if UPLOAD_CACHE and file_hash:
+            cache_dir = _upload_cache_dir(file_hash, file_ext, page_range)
+            cached = _load_cached_upload(cache_dir, temp_dir)
         
-        if file_ext in ['doc', 'docx']:
-            # 转换Word为PDF
-            pdf_path = convert_word_to_pdf(upload_path, temp_dir)
-        
-        # 分离PDF页面（支持页码范围）
-        odd_path, even_path, total_pages, selected_count = split_pdf_pages(
-            pdf_path, temp_dir, page_range if page_range else None
-        )
+        if cached is not None:
+            # 缓存命中：文件已链接到会话目录，跳过转换和拆分
+            pdf_path = os.path.join(temp_dir, cached['pdf_name']) if cached['pdf_name'] else upload_path
+            odd_path = os.path.join(temp_dir, cached['odd_name']) if cached['odd_name'] else None
+            even_path = os.path.join(temp_dir, cached['even_name']) if cached['even_name'] else None
+            odd_page_list = cached['odd_page_list']
+            even_page_list = cached['even_page_list']
+            total_pages = cached['total_pages']
+            selected_count = cached['selected_count']
+            odd_count = cached['odd_count']
+            even_count = cached['even_count']
+        else:
+            pdf_path = upload_path
+            
+            if file_ext in ['doc', 'docx']:
+                # 转换Word为PDF
+                pdf_path = convert_word_to_pdf(upload_path, temp_dir)
+            
+            odd_page_list = None
+            even_page_list = None
+            if LP_PAGE_RANGES:
+                # 直接在原始PDF上用lp -P选择页面，不生成拆分后的PDF
+                _, total_pages, odd_indices, even_indices = select_pdf_pages(
+                    pdf_path, page_range if page_range else None
+                )
+                odd_path = even_path = None
+                odd_count = len(odd_indices)
+                even_count = len(even_indices)
+                selected_count = odd_count + even_count
+                odd_page_list = format_page_list(odd_indices)
+                even_page_list = format_page_list(even_indices)
+            else:
+                # 分离PDF页面（支持页码范围）
+                odd_path, even_path, total_pages, selected_count, odd_count, even_count = split_pdf_pages(
+                    pdf_path, temp_dir, page_range if page_range else None
+                )
+            
+            if cache_dir is not None:
+                _store_cached_upload(cache_dir, temp_dir, {
+                    'pdf_name': os.path.basename(pdf_path) if pdf_path != upload_path else None,
+                    'odd_name': os.path.basename(odd_path) if odd_path else None,
+                    'even_name': os.path.basename(even_path) if even_path else None,
+                    'odd_page_list': odd_page_list,
+                    'even_page_list': even_page_list,
+                    'total_pages': total_pages,
+                    'selected_count': selected_count,
+                    'odd_count': odd_count,
+                    'even_count': even_count,
+                })
         
-        # 计算奇偶页数量
-        reader = PdfReader(pdf_path)
-        selected_indices = parse_page_range(page_range if page_range else None, total_pages)
-        odd_count = sum(1 for idx in selected_indices if idx % 2 == 0)
-        even_count = len(selected_indices) - odd_count
+        if pdf_path == upload_path:
+            if LP_PAGE_RANGES:
+                # 打印时需要原始PDF，移动到会话目录中，随会话一起清理
+                pdf_path = os.path.join(temp_dir, 'source.pdf')
+                shutil.move(upload_path, pdf_path)
+            else:
+                pdf_path = None  # 已拆分为奇偶页文件，原文件在下面删除
         
         # 保存会话信息
         session_info = {
             'filename': filename,
             'upload_path': upload_path,
             'temp_dir': temp_dir,
+            'pdf_path': pdf_path,
+            'odd_page_list': odd_page_list,
+            'even_page_list': even_page_list,
             'odd_path': odd_path,
             'even_path': even_path,
             'total_pages': total_pages,
             'selected_count': selected_count,
+            'odd_count': odd_count,
+            'even_count': even_count,
             'page_range': page_range if page_range else None,
             'odd_printed': False,
             'even_printed': False
         }
         
-        # 保存会话信息到文件
-        session_file = os.path.join(temp_dir, 'session.json')
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session_info, f, ensure_ascii=False)
+        session_id = os.path.basename(temp_dir)
+        with _SESSIONS_LOCK:
+            # 异步处理期间会话已被清理（任务记录已移除）时不再保存会话
+            dropped = async_job and session_id not in _UPLOAD_JOBS
+            if not dropped:
+                _save_session(session_id, session_info)
+                # 刚生成的文件，无需在查询会话时马上再检查是否存在
+                _SESSION_FILE_CHECKS[session_id] = (
+                    time.monotonic(),
+                    odd_page_list is not None or odd_path is not None,
+                    even_page_list is not None or even_path is not None,
+                )
+        if dropped:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return {'error': '会话已被清理'}, 410
         
-        return jsonify({
+        return {
             'success': True,
-            'session_id': os.path.basename(temp_dir),
+            'session_id': session_id,
             'total_pages': total_pages,
             'selected_pages': selected_count,
             'odd_pages': odd_count,
             'even_pages': even_count,
             'page_range': page_range if page_range else '全部页面'
-        })
+        }, 200
     except ValueError as e:
-        return jsonify({'error': f'页码范围格式错误: {str(e)}'}), 400
+        return {'error': f'页码范围格式错误: {str(e)}'}, 400
     except Exception as e:
-        error_info = format_error_message(e)
-        response_data = {
-            'error': f'处理文件失败: {error_info["error"]}',
-            'error_type': error_info['type']
-        }
-        if app.debug or DEBUG_MODE:
-            response_data['traceback'] = error_info.get('traceback', '')
-        return jsonify(response_data), 500
+        return _error_payload(e, '处理文件失败'), 500
+    finally:
+        # 转换和拆分后不再需要上传的原文件（需要时已移动到会话目录），删除以免一直占用空间（使用内存文件系统时占用内存）
+        try:
+            os.remove(upload_path)
+        except FileNotFoundError:
+            pass
 
 
-@app.route('/api/print/odd', methods=['POST'])
-def print_odd_pages():
+@app.route('/api/upload/status/<session_id>', methods=['GET'])
+def get_upload_status(session_id):
     """
-    打印奇数页
+    查询异步上传的处理状态
     
+    Args:
+        session_id: 会话ID
+        
     Returns:
-        json: 打印结果
+        json: 处理中时返回 status=processing；完成或失败时返回与同步上传相同的结果，并附带status字段
     """
-    data = request.json
-    session_id = data.get('session_id')
-    printer_name = data.get('printer_name')
-    print_quality = data.get('print_quality', 'Normal')
-    
-    if not session_id:
-        return jsonify({'error': '缺少session_id'}), 400
+    job = _UPLOAD_JOBS.get(session_id)
+    if job is None:
+        return jsonify({'error': '上传任务不存在'}), 404
     
-    session_file = os.path.join(TEMP_FOLDER, session_id, 'session.json')
+    if job['status'] == 'processing':
+        return jsonify({'success': True, 'session_id': session_id, 'status': 'processing'})
     
-    if not os.path.exists(session_file):
-        return jsonify({'error': '会话不存在'}), 404
+    return jsonify({**job['result'], 'status': job['status']}), job['code']
+
+
+def _print_session_pages(session_id, session_info, phase, printer_name, print_quality):
+    """
+    打印会话中的奇数页或偶数页，成功后更新并保存会话信息
     
-    try:
-        with open(session_file, 'r', encoding='utf-8') as f:
-            session_info = json.load(f)
-        
-        odd_path = session_info['odd_path']
-        
-        # 打印奇数页
-        success, error_msg, job_id = print_pdf(odd_path, printer_name, print_quality)
+    Args:
+        session_id: 会话ID
+        session_info: 会话信息
+        phase: 'odd' 或 'even'
+        printer_name: 打印机名称
+        print_quality: 打印质量
         
-        if success:
-            session_info['odd_printed'] = True
-            session_info['odd_job_id'] = job_id
-            session_info['printer_name'] = printer_name
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_info, f, ensure_ascii=False)
-            
-            return jsonify({
-                'success': True,
-                'message': '奇数页打印任务已提交',
-                'job_id': job_id
-            })
-        else:
-            return jsonify({'error': error_msg or '打印失败'}), 500
-    
-    except Exception as e:
-        error_info = format_error_message(e)
-        response_data = {
-            'error': f'打印错误: {error_info["error"]}',
-            'error_type': error_info['type']
+    Returns:
+        tuple: (是否成功, 错误信息, 打印任务ID)
+    """
+    page_list = session_info.get(f'{phase}_page_list')
+    if page_list is not None:
+        # 直接用lp -P打印原始PDF中的页面，奇数页逆序输出（从大到小）
+        success, error_msg, job_id = print_pdf(
+            session_info['pdf_path'], printer_name, print_quality,
+            output_order='reverse' if phase == 'odd' else 'normal', page_list=page_list
+        )
+    else:
+        # 拆分后的奇数页文件已经是倒序（从大到小），偶数页文件是正序（从小到大）
+        success, error_msg, job_id = print_pdf(session_info[f'{phase}_path'], printer_name, print_quality)
+    
+    if success:
+        updates = {
+            f'{phase}_printed': True,
+            f'{phase}_job_id': job_id,
+            'printer_name': printer_name,
         }
-        if app.debug or DEBUG_MODE:
-            response_data['traceback'] = error_info.get('traceback', '')
-        return jsonify(response_data), 500
+        # 只有会话信息确实变化时才保存（如重复打印同一面且没有获取到新的任务ID）
+        if any(session_info.get(key) != value for key, value in updates.items()):
+            session_info.update(updates)
+            _save_session(session_id, session_info)
+    
+    return success, error_msg, job_id
 
 
-@app.route('/api/print/even', methods=['POST'])
-def print_even_pages():
+def _handle_print_request(phase):
     """
-    打印偶数页
+    处理打印请求（奇数页和偶数页接口共用）
     
+    Args:
+        phase: 'odd' 或 'even'
+        
     Returns:
         json: 打印结果
     """
@@ -1037,44 +2541,61 @@ def print_even_pages():
     if not session_id:
         return jsonify({'error': '缺少session_id'}), 400
     
-    session_file = os.path.join(TEMP_FOLDER, session_id, 'session.json')
-    
-    if not os.path.exists(session_file):
+    session_info = _load_session(session_id)
+    if session_info is None:
         return jsonify({'error': '会话不存在'}), 404
     
+    if session_info.get(f'{phase}_count') == 0:
+        # 选择的页面中没有该奇偶性的页面，无需提交打印任务，直接标记为已完成
+        if not session_info.get(f'{phase}_printed'):
+            session_info[f'{phase}_printed'] = True
+            _save_session(session_id, session_info)
+        message = '没有需要打印的奇数页' if phase == 'odd' else '没有需要打印的偶数页'
+        return jsonify({
+            'success': True,
+            'skipped': True,
+            'reason': message,
+            'message': message,
+            'job_id': None
+        })
+    
     try:
-        with open(session_file, 'r', encoding='utf-8') as f:
-            session_info = json.load(f)
-        
-        even_path = session_info['even_path']
-        
-        # 打印偶数页
-        success, error_msg, job_id = print_pdf(even_path, printer_name, print_quality)
-        
+        success, error_msg, job_id = _print_session_pages(
+            session_id, session_info, phase, printer_name, print_quality
+        )
         if success:
-            session_info['even_printed'] = True
-            session_info['even_job_id'] = job_id
-            session_info['printer_name'] = printer_name
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_info, f, ensure_ascii=False)
-            
             return jsonify({
                 'success': True,
-                'message': '偶数页打印任务已提交',
+                'message': '奇数页打印任务已提交' if phase == 'odd' else '偶数页打印任务已提交',
                 'job_id': job_id
             })
         else:
             return jsonify({'error': error_msg or '打印失败'}), 500
     
     except Exception as e:
-        error_info = format_error_message(e)
-        response_data = {
-            'error': f'打印错误: {error_info["error"]}',
-            'error_type': error_info['type']
-        }
-        if app.debug or DEBUG_MODE:
-            response_data['traceback'] = error_info.get('traceback', '')
-        return jsonify(response_data), 500
+        return _error_response(e, '打印错误')
+
+
+@app.route('/api/print/odd', methods=['POST'])
+def print_odd_pages():
+    """
+    打印奇数页
+    
+    Returns:
+        json: 打印结果
+    """
+    return _handle_print_request('odd')
+
+
+@app.route('/api/print/even', methods=['POST'])
+def print_even_pages():
+    """
+    打印偶数页
+    
+    Returns:
+        json: 打印结果
+    """
+    return _handle_print_request('even')
 
 
 @app.route('/api/print/status', methods=['GET'])
@@ -1090,16 +2611,11 @@ def get_print_status():
     
     # 如果提供了session_id，从会话中获取打印机名称
     if session_id:
-        session_file = os.path.join(TEMP_FOLDER, session_id, 'session.json')
-        if os.path.exists(session_file):
-            try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session_info = json.load(f)
-                printer_name = session_info.get('printer_name') or printer_name
-            except:
-                pass
+        session_info = _load_session(session_id)
+        if session_info:
+            printer_name = session_info.get('printer_name') or printer_name
     
-    status = get_print_job_status(printer_name, session_id)
+    status = get_print_job_status_cached(printer_name, session_id)
     return jsonify(status)
 
 
@@ -1108,44 +2624,49 @@ def get_session_info(session_id):
     """
     获取会话信息（用于断线重连）
     
+    查询参数 fields=printed 时只返回打印状态（odd_printed、even_printed、printer_name），
+    不检查文件和计算页数，用于频繁轮询
+    
     Args:
         session_id: 会话ID
         
     Returns:
         json: 会话信息
     """
-    session_file = os.path.join(TEMP_FOLDER, session_id, 'session.json')
-    
-    if not os.path.exists(session_file):
+    session_info = _load_session(session_id)
+    if session_info is None:
         return jsonify({'error': '会话不存在或已过期'}), 404
     
+    if request.args.get('fields') == 'printed':
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'odd_printed': session_info.get('odd_printed', False),
+            'even_printed': session_info.get('even_printed', False),
+            'printer_name': session_info.get('printer_name')
+        })
+    
     try:
-        with open(session_file, 'r', encoding='utf-8') as f:
-            session_info = json.load(f)
-        
-        # 检查文件是否还存在
-        odd_exists = os.path.exists(session_info.get('odd_path', ''))
-        even_exists = os.path.exists(session_info.get('even_path', ''))
+        # 检查文件是否还存在（短时间内的重复查询使用上次的检查结果）
+        odd_exists, even_exists = _session_files_exist(session_id, session_info)
         
         # 计算奇偶页数量（基于选择的页面范围）
         total_pages = session_info.get('total_pages', 0)
         selected_count = session_info.get('selected_count', total_pages)
         page_range = session_info.get('page_range')
         
-        # 如果有页码范围，需要重新计算奇偶页数量
-        if page_range and total_pages > 0:
+        # 上传时已保存奇偶页数量；旧的会话文件中没有时再根据页码范围计算
+        if 'odd_count' in session_info and 'even_count' in session_info:
+            odd_count = session_info['odd_count']
+            even_count = session_info['even_count']
+        else:
+            # count_odd_even_pages同时处理全部页面和指定页码范围两种情况
             try:
-                selected_indices = parse_page_range(page_range, total_pages)
-                odd_count = sum(1 for idx in selected_indices if idx % 2 == 0)
-                even_count = len(selected_indices) - odd_count
-            except:
+                odd_count, even_count = count_odd_even_pages(page_range, total_pages)
+            except ValueError:
                 # 如果解析失败，使用默认计算
                 odd_count = (selected_count + 1) // 2
                 even_count = selected_count // 2
-        else:
-            # 全部页面
-            odd_count = (total_pages + 1) // 2
-            even_count = total_pages // 2
         
         return jsonify({
             'success': True,
@@ -1167,6 +2688,45 @@ def get_session_info(session_id):
         return jsonify({'error': f'读取会话信息失败: {str(e)}'}), 500
 
 
+@app.route('/api/session/<session_id>/pdf/<phase>', methods=['GET'])
+def get_session_pdf(session_id, phase):
+    """
+    下载会话中拆分后的奇数页或偶数页PDF（用于预览）
+    
+    Args:
+        session_id: 会话ID
+        phase: 'odd' 或 'even'
+        
+    Returns:
+        PDF文件（支持条件请求和Range请求），或json错误信息
+    """
+    if phase not in ('odd', 'even'):
+        return jsonify({'error': 'phase必须为odd或even'}), 400
+    
+    session_info = _load_session(session_id)
+    if session_info is None:
+        return jsonify({'error': '会话不存在'}), 404
+    
+    pdf_path = session_info.get(f'{phase}_path')
+    if not pdf_path or not os.path.exists(pdf_path):
+        return jsonify({'error': '没有拆分后的PDF文件'}), 404
+    
+    # send_file交给WSGI服务器的wsgi.file_wrapper发送（waitress等服务器直接从文件读取，不经过应用代码复制），
+    # 浏览器重复预览时通过ETag/Last-Modified返回304
+    # 会话中保存的可能是相对路径（相对于当前工作目录），send_file会把相对路径按app.root_path解析，需要先转为绝对路径
+    try:
+        return send_file(
+            os.path.abspath(pdf_path),
+            mimetype='application/pdf',
+            download_name=f'{phase}_pages.pdf',
+            conditional=True,
+            etag=True
+        )
+    except FileNotFoundError:
+        # 检查之后文件被清理
+        return jsonify({'error': '没有拆分后的PDF文件'}), 404
+
+
 @app.route('/api/cleanup/<session_id>', methods=['DELETE'])
 def cleanup_session(session_id):
     """
@@ -1179,20 +2739,16 @@ def cleanup_session(session_id):
         json: 清理结果
     """
     try:
-        import shutil
-        session_dir = os.path.join(TEMP_FOLDER, session_id)
-        if os.path.exists(session_dir):
-            shutil.rmtree(session_dir)
+        _drop_session(session_id)
+        session_dir = _session_path(session_id).parent
+        if session_dir.exists():
+            # 先重命名（只修改目录项，立即完成），再由后台线程删除文件，请求不等待删除
+            trash_dir = session_dir.with_name(session_dir.name + '.del')
+            session_dir.rename(trash_dir)
+            _CLEANUP_WORKER.submit(shutil.rmtree, trash_dir, ignore_errors=True)
         return jsonify({'success': True})
     except Exception as e:
-        error_info = format_error_message(e)
-        response_data = {
-            'error': f'清理失败: {error_info["error"]}',
-            'error_type': error_info['type']
-        }
-        if app.debug or DEBUG_MODE:
-            response_data['traceback'] = error_info.get('traceback', '')
-        return jsonify(response_data), 500
+        return _error_response(e, '清理失败')
 
 
 # 添加全局错误处理器
@@ -1207,14 +2763,7 @@ def internal_error(error):
     Returns:
         json: 错误响应
     """
-    error_info = format_error_message(error)
-    response_data = {
-        'error': f'服务器内部错误: {error_info["error"]}',
-        'error_type': error_info['type']
-    }
-    if app.debug or DEBUG_MODE:
-        response_data['traceback'] = error_info.get('traceback', '')
-    return jsonify(response_data), 500
+    return _error_response(error, '服务器内部错误')
 
 
 @app.errorhandler(Exception)
@@ -1228,16 +2777,26 @@ def handle_exception(e):
     Returns:
         json: 错误响应
     """
-    error_info = format_error_message(e)
-    response_data = {
-        'error': f'发生错误: {error_info["error"]}',
-        'error_type': error_info['type']
-    }
-    if app.debug or DEBUG_MODE:
-        response_data['traceback'] = error_info.get('traceback', '')
-    return jsonify(response_data), 500
+    return _error_response(e, '发生错误')
+
+
+def run_server(host=HOST, port=PORT, debug=False):
+    """
+    启动Web服务器：已安装waitress且非调试模式时使用waitress，否则使用Flask开发服务器
+    
+    Args:
+        host: 监听地址
+        port: 端口号
+        debug: 是否启用调试模式（使用Flask开发服务器，支持自动重载）
+    """
+    if waitress is not None and not debug:
+        waitress.serve(app, host=host, port=port, threads=WSGI_THREADS)
+    else:
+        app.run(debug=debug, host=host, port=port, threaded=True)
 
 
+# 以下仅在直接运行 python app.py 启动服务器时执行，
+# 通过其他WSGI服务器导入app时不会加载argparse
 if __name__ == '__main__':
     # 从命令行参数或环境变量获取端口号
     import argparse
@@ -1246,25 +2805,26 @@ if __name__ == '__main__':
     parser.add_argument(
         '--port', '-p',
         type=int,
-        default=int(os.environ.get('PORT', 8000)),
+        default=PORT,
         help='服务器端口号（默认: 8000）'
     )
     parser.add_argument(
         '--host',
         type=str,
-        default=os.environ.get('HOST', '0.0.0.0'),
+        default=HOST,
         help='服务器主机地址（默认: 0.0.0.0）'
     )
     parser.add_argument(
         '--debug',
         action='store_true',
-        default=os.environ.get('DEBUG', '').lower() == 'true',
+        default=DEBUG,
         help='启用调试模式'
     )
     
     args = parser.parse_args()
+    INCLUDE_TRACEBACK = args.debug or app.debug or DEBUG_MODE
     
     # 开发模式下启用详细错误信息（app.debug=True会自动启用）
     print(f"启动服务器: http://{args.host}:{args.port}")
-    app.run(debug=args.debug, host=args.host, port=args.port)
+    run_server(host=args.host, port=args.port, debug=args.debug)
 
@@ -17,7 +17,7 @@ else:
     template_folder = os.path.join(base_path, 'templates')
 
 # 导入原始应用
-from app import app
+from app import app, run_server
 
 # 更新模板文件夹路径
 app.template_folder = template_folder
@@ -47,5 +47,5 @@ if __name__ == '__main__':
     print(f"上传目录: {UPLOAD_FOLDER}")
     print(f"临时目录: {TEMP_FOLDER}")
     print(f"访问地址: http://localhost:8000")
-    app.run(debug=False, host='0.0.0.0', port=8000)
+    run_server(host='0.0.0.0', port=8000)
 
@@ -1,48 +1,99 @@
 # -*- mode: python ; coding: utf-8 -*-
+# PyInstaller打包配置（所有打包选项都在这里，build_exe.py只负责调用PyInstaller）
+# 使用: pyinstaller build.spec --noconfirm
+import os
+import shutil
+import sys
 
-block_cipher = None
+from PyInstaller.utils.hooks import collect_data_files, collect_submodules
+
+# 以下模块在应用中通过importlib按名称导入，PyInstaller分析不到，需要显式指定
+hiddenimports = [
+    'flask',
+    'flask_cors',
+    'pypdf',
+    'waitress',  # WSGI服务器
+    'win32print',  # Windows打印机列表（可选）
+]
+# 只收集用到的包内容，不使用collect_all（会带入所有子模块、数据文件和二进制文件）
+hiddenimports += collect_submodules('flask')  # Flask的子模块（flask.json.provider等）
+
+# 把templates目录中的模板写入_bundled_templates模块，模板随字节码一起打包，
+# 运行时由app.py注册为Jinja的DictLoader，不需要再把templates作为数据文件复制和读取
+generated_dir = os.path.join(workpath, 'generated')  # workpath为打包工作目录，并行打包多个目标时各自独立
+os.makedirs(generated_dir, exist_ok=True)
+bundled_templates = {}
+for template_name in sorted(os.listdir(os.path.join(SPECPATH, 'templates'))):
+    if template_name.endswith('.html'):
+        with open(os.path.join(SPECPATH, 'templates', template_name), encoding='utf-8') as f:
+            bundled_templates[template_name] = f.read()
+with open(os.path.join(generated_dir, '_bundled_templates.py'), 'w', encoding='utf-8') as f:
+    f.write('# 由build.spec在打包时生成，不要手动修改\n')
+    f.write(f'TEMPLATES = {bundled_templates!r}\n')
+hiddenimports.append('_bundled_templates')
+
+datas = collect_data_files('pypdf')  # pypdf的子模块都是静态导入，能被自动分析到，只需要数据文件
+
+# 排除应用运行时用不到的标准库和工具模块（tkinter会带入Tcl/Tk，体积最大）
+excludes = [
+    'tkinter',
+    'unittest',
+    'pydoc',
+    'xmlrpc',
+    'pdb',
+    'test',
+    'distutils',
+    'setuptools',
+    'pip',
+    'email.test',
+]
+
+# 通过docx2pdf或Word COM转换Word文档需要pywin32的COM支持（体积较大），默认不打包
+# 设置环境变量 INCLUDE_DOCX=1 时打包
+if os.environ.get('INCLUDE_DOCX') == '1':
+    hiddenimports += ['docx2pdf', 'win32com.client', 'pythoncom']
+else:
+    excludes += ['docx2pdf', 'win32com', 'pythoncom']
+
+# 打包目标名称和是否显示控制台窗口（由build_exe.py通过环境变量设置，用于同时打包调试版本）
+app_name = os.environ.get('PYI_TARGET_NAME', '双面打印助手')
+console = os.environ.get('PYI_CONSOLE') == '1'
+
+# macOS/Linux上去掉动态库和扩展模块中的调试符号（减小体积，需要binutils中的strip命令）
+# Windows的DLL不包含这类符号，不需要strip
+strip = sys.platform != 'win32' and shutil.which('strip') is not None
+
+# VC运行库和Python DLL使用UPX压缩后容易被杀毒软件误报，不压缩
+upx_exclude = ['vcruntime140.dll', 'python3.dll', f'python3{sys.version_info.minor}.dll']
 
 a = Analysis(
     ['app.py'],
-    pathex=[],
+    pathex=[generated_dir],
     binaries=[],
-    datas=[
-        ('templates', 'templates'),  # 包含模板文件夹
-    ],
-    hiddenimports=[
-        'flask',
-        'flask_cors',
-        'pypdf',
-        'docx2pdf',
-        'win32com.client',  # Windows可选
-    ],
+    datas=datas,
+    hiddenimports=hiddenimports,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
-    win_no_prefer_redirects=False,
-    win_private_assemblies=False,
-    cipher=block_cipher,
+    excludes=excludes,
     noarchive=False,
+    optimize=2,  # 按 python -OO 编译打包的字节码，去掉assert和文档字符串（应用和依赖库都不依赖__doc__）
 )
 
-pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+pyz = PYZ(a.pure)
 
+# 打包为目录（单文件模式每次启动都要先解压到临时目录，启动慢）
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
     [],
-    name='双面打印助手',
+    exclude_binaries=True,
+    name=app_name,
     debug=False,
     bootloader_ignore_signals=False,
-    strip=False,
+    strip=strip,
     upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=True,  # 显示控制台窗口（可以改为False隐藏）
+    console=console,  # 默认不显示控制台窗口（需要查看日志时设置PYI_CONSOLE=1）
     disable_windowed_traceback=False,
     argv_emulation=False,
     target_arch=None,
@@ -50,3 +101,12 @@ exe = EXE(
     entitlements_file=None,
 )
 
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=strip,
+    upx=True,
+    upx_exclude=upx_exclude,
+    name=app_name,
+)
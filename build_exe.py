@@ -1,46 +1,188 @@
 """
 打包脚本：将Flask应用打包为可执行文件
-使用PyInstaller进行打包
+默认使用PyInstaller按build.spec进行打包（打包选项都在build.spec中），
+也可以使用 --backend=nuitka 通过Nuitka编译打包（需要安装nuitka）
 """
-import PyInstaller.__main__
+import argparse
+import importlib.util
 import os
+import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-# 获取项目根目录
-base_dir = os.path.dirname(os.path.abspath(__file__))
-
-# PyInstaller参数
-args = [
-    'app.py',  # 主程序文件
-    '--name=双面打印助手',  # 可执行文件名称
-    '--onefile',  # 打包为单个文件
-    '--windowed',  # Windows下不显示控制台（macOS/Linux使用--noconsole）
-    '--add-data=templates;templates',  # 包含模板文件（Windows使用分号）
-    '--hidden-import=flask',  # 显式导入Flask
-    '--hidden-import=flask_cors',  # 显式导入flask_cors
-    '--hidden-import=pypdf',  # 显式导入pypdf
-    '--hidden-import=docx2pdf',  # 显式导入docx2pdf（可选）
-    '--hidden-import=win32com.client',  # Windows Word支持（可选）
-    '--collect-all=flask',  # 收集Flask的所有数据
-    '--collect-all=pypdf',  # 收集pypdf的所有数据
+# 可执行文件扩展名（Windows上为.exe）
+IS_WIN = sys.platform == 'win32'
+EXE_SUFFIX = '.exe' if IS_WIN else ''
+
+# PyInstaller打包目标（名称、是否显示控制台窗口、工作目录），通过环境变量传给build.spec
+# 默认只打包第一个；使用 --debug-build 时同时打包显示控制台窗口的调试版本（并行打包）
+TARGETS = [
+    {'name': '双面打印助手', 'console': False, 'workpath': 'build'},
+    {'name': '双面打印助手-debug', 'console': True, 'workpath': os.path.join('build', 'debug')},
+]
+
+# Nuitka打包时排除的模块（与build.spec中的excludes保持一致）
+NUITKA_NOFOLLOW = [
+    'tkinter', 'unittest', 'pydoc', 'xmlrpc', 'pdb', 'test',
+    'distutils', 'setuptools', 'pip', 'email.test',
 ]
 
-# macOS/Linux使用冒号分隔，Windows使用分号
-if sys.platform != 'win32':
-    # 替换Windows风格的分号为Unix风格的冒号
-    args = [arg.replace(';', ':') if 'templates' in arg else arg for arg in args]
-    # macOS/Linux显示控制台窗口（可选，用于调试）
-    if '--windowed' in args:
-        args.remove('--windowed')
-        args.append('--noconsole')  # 或者保留控制台用于查看日志
 
-print("开始打包...")
-print(f"工作目录: {base_dir}")
-print(f"参数: {args}")
+def pyinstaller_args(base_dir, target):
+    """
+    生成PyInstaller打包命令
+
+    Args:
+        base_dir: 项目根目录
+        target: TARGETS中的打包目标
+
+    Returns:
+        list: 命令参数列表
+    """
+    args = [
+        sys.executable, '-m', 'PyInstaller',
+        os.path.join(base_dir, 'build.spec'),
+        '--noconfirm',  # 覆盖上次的输出目录时不询问
+        # 固定工作目录和输出目录，保留build/中的分析结果和编译缓存，再次打包时只处理有变化的模块
+        # （不使用--clean；如需完全重新打包，手动删除build目录即可）
+        # 每个打包目标使用单独的工作目录，并行打包时互不影响
+        f'--workpath={os.path.join(base_dir, target["workpath"])}',
+        f'--distpath={os.path.join(base_dir, "dist")}',
+        # 默认只输出警告和错误（INFO级别会为每个分析的模块输出一行日志），设置PYI_DEBUG=1时输出调试日志
+        '--log-level=DEBUG' if os.environ.get('PYI_DEBUG') == '1' else '--log-level=WARN',
+    ]
+
+    # 使用UPX压缩打包的可执行文件和动态库（减小体积）
+    # 优先使用环境变量UPX_DIR指定的目录，其次使用项目中的 tools/upx 目录
+    upx_dir = os.environ.get('UPX_DIR') or os.path.join(base_dir, 'tools', 'upx')
+    if os.path.isdir(upx_dir):
+        args.append(f'--upx-dir={upx_dir}')
+
+    return args
+
+
+def nuitka_args(base_dir):
+    """
+    生成Nuitka打包命令（将app.py编译为C代码，生成独立目录）
+
+    Args:
+        base_dir: 项目根目录
+
+    Returns:
+        list: 命令参数列表
+    """
+    args = [
+        sys.executable, '-m', 'nuitka',
+        '--standalone',  # 生成独立目录（与PyInstaller一样不使用单文件模式，启动时不需要解压）
+        '--assume-yes-for-downloads',
+        f'--include-data-dir={os.path.join(base_dir, "templates")}=templates',
+        '--enable-plugin=anti-bloat',
+        '--python-flag=-OO',  # 与build.spec中的optimize=2一致，去掉assert和文档字符串
+        f'--output-dir={os.path.join(base_dir, "dist")}',
+        '--output-filename=双面打印助手',
+    ]
+    args += [f'--nofollow-import-to={name}' for name in NUITKA_NOFOLLOW]
+
+    # 应用通过importlib按名称导入的可选模块，已安装时需要显式包含
+    optional_modules = ['waitress', 'win32print']
+    if os.environ.get('INCLUDE_DOCX') == '1':
+        optional_modules += ['docx2pdf', 'win32com.client', 'pythoncom']
+    else:
+        args += ['--nofollow-import-to=docx2pdf', '--nofollow-import-to=win32com', '--nofollow-import-to=pythoncom']
+    for name in optional_modules:
+        if importlib.util.find_spec(name.split('.')[0]) is not None:
+            args.append(f'--include-module={name}')
+
+    args.append(os.path.join(base_dir, 'app.py'))
+    return args
+
+
+def build_one(args, env, cwd):
+    """
+    执行一次打包（在子进程中运行打包工具，本脚本不需要导入PyInstaller或Nuitka）
+
+    Args:
+        args: 打包命令参数列表
+        env: 打包命令的环境变量
+        cwd: 打包命令的工作目录
+
+    Returns:
+        int: 打包命令的返回码
+    """
+    return subprocess.run(args, cwd=cwd, env=env).returncode
+
 
-# 执行打包
-PyInstaller.__main__.run(args)
+def main():
+    """
+    解析命令行参数并执行打包
+    """
+    parser = argparse.ArgumentParser(description='打包双面打印助手')
+    parser.add_argument(
+        '--backend',
+        choices=['pyinstaller', 'nuitka'],
+        default='pyinstaller',
+        help='打包工具（默认: pyinstaller）'
+    )
+    parser.add_argument(
+        '--debug-build',
+        action='store_true',
+        help='同时打包显示控制台窗口的调试版本（与正式版本并行打包，仅PyInstaller）'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='只显示打包命令，不执行打包'
+    )
+    options = parser.parse_args()
+    
+    # 项目根目录（只在打包时计算，导入本模块或显示帮助时不需要）
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    # PyInstaller的缓存（编译好的bootloader、二进制依赖分析结果等）放在项目目录中，
+    # CI可以缓存这个目录，避免每次打包都重新分析；已设置PYINSTALLER_CONFIG_DIR时使用设置的目录
+    env = dict(os.environ)
+    env.setdefault('PYINSTALLER_CONFIG_DIR', os.path.join(base_dir, '.pyinstaller-cache'))
+    
+    # 打包任务列表：(命令参数, 环境变量, 可执行文件位置)
+    jobs = []
+    if options.backend == 'nuitka':
+        jobs.append((nuitka_args(base_dir), env, "dist/app.dist/双面打印助手"))
+    else:
+        for target in (TARGETS if options.debug_build else TARGETS[:1]):
+            target_env = dict(env, PYI_TARGET_NAME=target['name'], PYI_CONSOLE='1' if target['console'] else '0')
+            jobs.append((pyinstaller_args(base_dir, target), target_env, f"dist/{target['name']}/{target['name']}"))
+    
+    if options.dry_run:
+        for args, _, _ in jobs:
+            print(subprocess.list2cmdline(args))
+        return
+    
+    if options.backend == 'nuitka' and importlib.util.find_spec('nuitka') is None:
+        print("未安装Nuitka，请先运行: pip install nuitka")
+        sys.exit(1)
+    
+    print("开始打包...（设置环境变量 PYI_DEBUG=1 可查看详细日志）")
+    print(f"工作目录: {base_dir}")
+    for args, _, _ in jobs:
+        print(f"参数: {args}")
+    
+    if len(jobs) == 1:
+        returncodes = [build_one(jobs[0][0], jobs[0][1], base_dir)]
+    else:
+        # 每个打包目标在单独的子进程中打包，用线程等待各子进程即可并行
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            returncodes = list(executor.map(lambda job: build_one(job[0], job[1], base_dir), jobs))
+    
+    failed = [code for code in returncodes if code != 0]
+    if failed:
+        print("\n打包失败！")
+        sys.exit(failed[0])
+    
+    print("\n打包完成！")
+    for _, _, exe_path in jobs:
+        print(f"可执行文件位置: {exe_path}{EXE_SUFFIX}")
+        print(f"发布时需要复制整个 {os.path.dirname(exe_path)} 目录（如需单个文件，可用安装包工具将该目录打包成安装程序）")
 
-print("\n打包完成！")
-print("可执行文件位置: dist/双面打印助手" + (".exe" if sys.platform == 'win32' else ""))
 
+if __name__ == '__main__':
+    main()